@@ -7,6 +7,7 @@ import math
 
 import bpy
 import mathutils
+import numpy as np
 
 ################################################################
 # helper functions BEGIN
@@ -86,27 +87,29 @@ def active_object():
 def time_seed():
     """
     Sets the random seed based on the time
-    and copies the seed into the clipboard
+    and copies the seed into the clipboard (skipped in background mode)
     """
     seed = time.time()
     print(f"seed: {seed}")
     random.seed(seed)
 
     # add the seed value to your clipboard
-    bpy.context.window_manager.clipboard = str(seed)
+    # there is no clipboard to write to when running headless (blender -b)
+    if not bpy.app.background:
+        bpy.context.window_manager.clipboard = str(seed)
 
     return seed
 
 
 def add_ctrl_empty(name=None):
 
-    bpy.ops.object.empty_add(type="PLAIN_AXES", align="WORLD")
-    empty_ctrl = active_object()
+    if not name:
+        name = "empty.cntrl"
 
-    if name:
-        empty_ctrl.name = name
-    else:
-        empty_ctrl.name = "empty.cntrl"
+    # create the empty with the data API to avoid the operator overhead of bpy.ops.object.empty_add
+    empty_ctrl = bpy.data.objects.new(name=name, object_data=None)
+    empty_ctrl.empty_display_type = "PLAIN_AXES"
+    bpy.context.collection.objects.link(empty_ctrl)
 
     return empty_ctrl
 
@@ -128,9 +131,8 @@ def track_empty(obj):
     """
     empty = add_ctrl_empty(name=f"empty.tracker-target.{obj.name}")
 
-    make_active(obj)
-    bpy.ops.object.constraint_add(type="TRACK_TO")
-    bpy.context.object.constraints["Track To"].target = empty
+    constraint = obj.constraints.new(type="TRACK_TO")
+    constraint.target = empty
 
     return empty
 
@@ -165,8 +167,11 @@ def setup_camera(loc, rot):
     """
     create and setup the camera
     """
-    bpy.ops.object.camera_add(location=loc, rotation=rot)
-    camera = active_object()
+    camera_data = bpy.data.cameras.new(name="Camera")
+    camera = bpy.data.objects.new(name="Camera", object_data=camera_data)
+    bpy.context.collection.objects.link(camera)
+    camera.location = loc
+    camera.rotation_euler = rot
 
     # set the camera as the "active camera" in the scene
     bpy.context.scene.camera = camera
@@ -231,14 +236,13 @@ def make_ramp_from_colors(colors, color_ramp_node):
     color_count = len(colors)
 
     step = 1 / color_count
-    cur_pos = step
-    # -2 is for the two sliders that are present on the ramp
-    for _ in range(color_count - 2):
-        color_ramp_node.elements.new(cur_pos)
-        cur_pos += step
 
-    for i, color in enumerate(colors):
-        color_ramp_node.elements[i].color = color
+    # the first and the last sliders are already present on the ramp
+    color_ramp_node.elements[0].color = colors[0]
+    for i in range(1, color_count - 1):
+        element = color_ramp_node.elements.new(i * step)
+        element.color = colors[i]
+    color_ramp_node.elements[-1].color = colors[-1]
 
 
 def get_color_palette():
@@ -397,13 +401,8 @@ def gen_base_material():
     material = bpy.data.materials.new(name="base_material")
     material.use_nodes = True
 
-    # remove all nodes from the material
-    nodes_to_remove = []
-    for node in material.node_tree.nodes:
-        nodes_to_remove.append(node)
-
-    for node in nodes_to_remove:
-        material.node_tree.nodes.remove(node)
+    # remove all the default nodes from the material in a single call
+    material.node_tree.nodes.clear()
 
     location_x = 0
 
@@ -462,32 +461,52 @@ def setup_material(context):
 
 
 def gen_perlin_curve(context, random_location, current_z):
-
-    bpy.ops.mesh.primitive_circle_add(vertices=512, radius=context["radius"], location=(0, 0, current_z))
-    circle = active_object()
-    apply_location()
-
-    deform_coords = []
-
-    for vert in circle.data.vertices:
-        new_location = vert.co + random_location
+    """
+    Build the circle curve directly with the data API
+    (instead of adding a mesh circle and converting it with bpy.ops)
+    so no depsgraph update is triggered while the scene is generated
+    """
+    vertex_count = 512
+    radius = context["radius"]
+
+    # the points are in the same order as converting bpy.ops.mesh.primitive_circle_add() into a curve,
+    # the conversion walks the circle backwards starting at the first vertex (0, n-1, n-2, ..., 1)
+    # so the angle of every point is negated
+    angles = -2 * math.pi * np.arange(vertex_count) / vertex_count
+    circle_coords = np.empty((vertex_count, 3), dtype=np.float32)
+    circle_coords[:, 0] = -radius * np.sin(angles)
+    circle_coords[:, 1] = radius * np.cos(angles)
+    circle_coords[:, 2] = current_z
+
+    # pre-allocate the buffer instead of growing a list of Vectors
+    deform_coords = np.empty((vertex_count, 3), dtype=np.float32)
+
+    for i, (x, y, z) in enumerate(circle_coords.tolist()):
+        new_location = random_location + mathutils.Vector((x, y, z))
         noise_value = mathutils.noise.noise(new_location)
         noise_value = noise_value / 2
 
-        projected_co = mathutils.Vector((vert.co.x, vert.co.y, 0))
-        deform_vector = projected_co * noise_value
+        deform_coords[i] = (x + x * noise_value, y + y * noise_value, z)
 
-        deform_coord = vert.co + deform_vector
-        deform_coords.append(deform_coord)
+    curve_data = bpy.data.curves.new(name="Circle", type="CURVE")
+    curve_data.dimensions = "3D"
 
-    bpy.ops.object.convert(target="CURVE")
-    curve_obj = active_object()
+    spline = curve_data.splines.new("POLY")
+    spline.points.add(vertex_count - 1)
+    point_coords = np.ones((vertex_count, 4), dtype=np.float32)
+    point_coords[:, :3] = circle_coords
+    spline.points.foreach_set("co", point_coords.ravel())
+    spline.use_cyclic_u = True
+    # same as bpy.ops.object.shade_flat()
+    spline.use_smooth = False
+
+    curve_data.materials.append(context["material"])
 
-    curve_obj.data.materials.append(context["material"])
-    bpy.ops.object.shade_flat()
+    curve_data.bevel_mode = "OBJECT"  # remove this for Blender 2.8
+    curve_data.bevel_object = context["bevel object"]
 
-    curve_obj.data.bevel_mode = "OBJECT"  # remove this for Blender 2.8
-    curve_obj.data.bevel_object = context["bevel object"]
+    curve_obj = bpy.data.objects.new(name="Circle", object_data=curve_data)
+    bpy.context.collection.objects.link(curve_obj)
 
     shape_key = add_shape_key(curve_obj, deform_coords)
 
@@ -500,9 +519,8 @@ def add_shape_key(curve_obj, deform_coords):
 
     shape_key = curve_obj.shape_key_add(name="Deform")
 
-    deform_coords.reverse()
-    for i, coord in enumerate(deform_coords):
-        shape_key.data[i].co = coord
+    # the deform coordinates are already in the order of the curve points
+    shape_key.data.foreach_set("co", deform_coords.ravel())
     shape_key.value = 1
 
     return shape_key
@@ -520,22 +538,43 @@ def create_bevel_object():
     return bevel_obj
 
 
-def animate_curve(shape_key, start_frame):
+def create_deform_action():
+    """
+    Create one action with the 1 -> 0 -> 1 shape key loop
+    that is shared by all the curves through NLA strips
+    """
     start_value = 1
     mid_value = 0
 
     loop_length = 60
 
-    shape_key.value = start_value
-    shape_key.keyframe_insert("value", frame=start_frame)
+    action = bpy.data.actions.new(name="deform_loop")
+    action.id_root = "KEY"
 
-    current_frame = start_frame + loop_length / 2
-    shape_key.value = mid_value
-    shape_key.keyframe_insert("value", frame=current_frame)
+    fcurve = action.fcurves.new(data_path='key_blocks["Deform"].value')
+    fcurve.keyframe_points.add(3)
+    fcurve.keyframe_points.foreach_set(
+        "co",
+        [
+            0,
+            start_value,
+            loop_length / 2,
+            mid_value,
+            loop_length,
+            start_value,
+        ],
+    )
+    fcurve.update()
 
-    current_frame = start_frame + loop_length
-    shape_key.value = start_value
-    shape_key.keyframe_insert("value", frame=current_frame)
+    return action
+
+
+def animate_curve(shape_key, start_frame, deform_action):
+    shape_keys = shape_key.id_data
+    shape_keys.animation_data_create()
+
+    track = shape_keys.animation_data.nla_tracks.new()
+    track.strips.new(name="deform", start=int(start_frame), action=deform_action)
 
     start_frame += 1
 
@@ -546,6 +585,9 @@ def gen_scene(context):
     gen_centerpiece(context)
     add_lights(context)
 
+    # evaluate the depsgraph once after the whole scene is built
+    bpy.context.view_layer.update()
+
 
 def gen_centerpiece(context):
 
@@ -555,12 +597,13 @@ def gen_centerpiece(context):
     context["material"] = setup_material(context)
     context["bevel object"] = create_bevel_object()
     context["radius"] = 1.1
+    deform_action = create_deform_action()
     start_frame = 1
     for i in range(curve_count):
         current_z = 0.1 * i
         shape_key = gen_perlin_curve(context, random_location, current_z)
 
-        start_frame = animate_curve(shape_key, start_frame)
+        start_frame = animate_curve(shape_key, start_frame, deform_action)
 
 
 def main():
@@ -10,11 +10,13 @@ https://www.youtube.com/watch?v=KWoJgHFYWxY&t=0s
 
 """
 
+import functools
 import random
 import time
 import math
 
 import bpy
+import numpy as np
 
 ################################################################
 # helper functions BEGIN
@@ -33,10 +35,20 @@ def purge_orphans():
         bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
     else:
         # run this only for Blender versions lower than 3.0
-        # call purge_orphans() recursively until there are no more orphan data blocks to purge
-        result = bpy.ops.outliner.orphans_purge()
-        if result.pop() != "CANCELLED":
-            purge_orphans()
+        # call the purge operator in a loop until there are no more orphan data blocks to purge
+        while True:
+            data_block_count_before = count_purgeable_data_blocks()
+            result = bpy.ops.outliner.orphans_purge()
+            if result.pop() == "CANCELLED":
+                break
+            # stop if the last purge did not remove anything to guarantee the loop ends
+            if count_purgeable_data_blocks() == data_block_count_before:
+                break
+
+
+def count_purgeable_data_blocks():
+    data_collections = ("meshes", "materials", "textures", "images", "curves", "actions", "worlds")
+    return sum(len(getattr(bpy.data, data_collection)) for data_collection in data_collections)
 
 
 def clean_scene():
@@ -54,10 +66,12 @@ def clean_scene():
         bpy.ops.object.editmode_toggle()
 
     # make sure non of the objects are hidden from the viewport, selection, or disabled
+    # (only touch the hidden objects since every hide_set() call refreshes the view layer)
     for obj in bpy.data.objects:
-        obj.hide_set(False)
-        obj.hide_select = False
-        obj.hide_viewport = False
+        if obj.hide_get() or obj.hide_select or obj.hide_viewport:
+            obj.hide_set(False)
+            obj.hide_select = False
+            obj.hide_viewport = False
 
     # select all the object and delete them (just like pressing A + X + D in the viewport)
     bpy.ops.object.select_all(action="SELECT")
@@ -104,19 +118,21 @@ def time_seed():
 
 def add_ctrl_empty(name=None):
 
-    bpy.ops.object.empty_add(type="PLAIN_AXES", align="WORLD")
-    empty_ctrl = active_object()
+    if not name:
+        name = "empty.cntrl"
 
-    if name:
-        empty_ctrl.name = name
-    else:
-        empty_ctrl.name = "empty.cntrl"
+    # create the empty with the data API to avoid the operator overhead of bpy.ops.object.empty_add
+    empty_ctrl = bpy.data.objects.new(name=name, object_data=None)
+    empty_ctrl.empty_display_type = "PLAIN_AXES"
+    bpy.context.collection.objects.link(empty_ctrl)
 
     return empty_ctrl
 
 
 def make_active(obj):
-    bpy.ops.object.select_all(action="DESELECT")
+    # deselect only the selected objects instead of running the select_all operator on every object
+    for selected_obj in bpy.context.selected_objects:
+        selected_obj.select_set(False)
     obj.select_set(True)
     bpy.context.view_layer.objects.active = obj
 
@@ -127,9 +143,8 @@ def track_empty(obj):
     """
     empty = add_ctrl_empty(name=f"empty.tracker-target.{obj.name}")
 
-    make_active(obj)
-    bpy.ops.object.constraint_add(type="TRACK_TO")
-    bpy.context.object.constraints["Track To"].target = empty
+    constraint = obj.constraints.new(type="TRACK_TO")
+    constraint.target = empty
 
     return empty
 
@@ -142,8 +157,11 @@ def set_1080px_square_render_res():
     bpy.context.scene.render.resolution_y = 1080
 
 
-def set_fcurve_extrapolation_to_linear():
-    for fc in bpy.context.active_object.animation_data.action.fcurves:
+def set_fcurve_extrapolation_to_linear(animated_id=None):
+    if animated_id is None:
+        animated_id = bpy.context.active_object
+
+    for fc in animated_id.animation_data.action.fcurves:
         fc.extrapolation = "LINEAR"
 
 
@@ -165,27 +183,28 @@ def hex_color_to_rgb(hex_color):
 
     assert len(hex_color) == 6, f"RRGGBB is the supported hex color format: {hex_color}"
 
+    # parsing all the color components at once - RRGGBB
+    rgb = int(hex_color, 16)
+
     # extracting the Red color component - RRxxxx
-    red = int(hex_color[:2], 16)
-    # dividing by 255 to get a number between 0.0 and 1.0
-    srgb_red = red / 255
-    linear_red = convert_srgb_to_linear_rgb(srgb_red)
+    red = (rgb >> 16) & 0xFF
+    # looking up the precomputed Linear RGB value of the 8-bit component
+    linear_red = _SRGB_TO_LINEAR_LUT[red]
 
     # extracting the Green color component - xxGGxx
-    green = int(hex_color[2:4], 16)
-    # dividing by 255 to get a number between 0.0 and 1.0
-    srgb_green = green / 255
-    linear_green = convert_srgb_to_linear_rgb(srgb_green)
+    green = (rgb >> 8) & 0xFF
+    # looking up the precomputed Linear RGB value of the 8-bit component
+    linear_green = _SRGB_TO_LINEAR_LUT[green]
 
     # extracting the Blue color component - xxxxBB
-    blue = int(hex_color[4:6], 16)
-    # dividing by 255 to get a number between 0.0 and 1.0
-    srgb_blue = blue / 255
-    linear_blue = convert_srgb_to_linear_rgb(srgb_blue)
+    blue = rgb & 0xFF
+    # looking up the precomputed Linear RGB value of the 8-bit component
+    linear_blue = _SRGB_TO_LINEAR_LUT[blue]
 
     return tuple([linear_red, linear_green, linear_blue])
 
 
+@functools.lru_cache(maxsize=64)
 def hex_color_to_rgba(hex_color, alpha=1.0):
     """
     Converting from a color in the form of a hex triplet string (en.wikipedia.org/wiki/Web_colors#Hex_triplet)
@@ -193,6 +212,8 @@ def hex_color_to_rgba(hex_color, alpha=1.0):
 
     Supports: "#RRGGBB" or "RRGGBB"
 
+    Note: the results are cached since the same few palette colors are converted over and over
+
     Video Tutorial: https://www.youtube.com/watch?v=knc1CGBhJeU
     """
     linear_red, linear_green, linear_blue = hex_color_to_rgb(hex_color)
@@ -209,11 +230,30 @@ def convert_srgb_to_linear_rgb(srgb_color_component):
     if srgb_color_component <= 0.04045:
         linear_color_component = srgb_color_component / 12.92
     else:
-        linear_color_component = math.pow((srgb_color_component + 0.055) / 1.055, 2.4)
+        linear_color_component = ((srgb_color_component + 0.055) / 1.055) ** 2.4
 
     return linear_color_component
 
 
+def convert_srgb_to_linear_rgb_array(srgb_color_components):
+    """
+    Converting a NumPy array of sRGB color components to Linear RGB in one vectorized pass
+
+    Same formula as convert_srgb_to_linear_rgb() but without the branch,
+    both sides are calculated and np.where() selects the result for each component
+    """
+    return np.where(
+        srgb_color_components <= 0.04045,
+        srgb_color_components / 12.92,
+        ((srgb_color_components + 0.055) / 1.055) ** 2.4,
+    )
+
+
+# a hex color component is always one of 256 values,
+# so the sRGB to Linear RGB conversion is precomputed once for all of them
+_SRGB_TO_LINEAR_LUT = tuple(convert_srgb_to_linear_rgb_array(np.arange(256) / 255).tolist())
+
+
 def create_emission_material(color, name=None, energy=30, return_nodes=False):
     if name is None:
         name = ""
@@ -239,6 +279,41 @@ def create_emission_material(color, name=None, energy=30, return_nodes=False):
         return material
 
 
+def create_object_color_emission_material(strength_property_name, name=None):
+    """
+    Create an emission material that can be shared between many objects.
+    The color comes from the Object Color (obj.color) and
+    the strength comes from a custom property on each object
+    """
+    if name is None:
+        name = "shared"
+
+    material = bpy.data.materials.new(name=f"material.emission.{name}")
+    material.use_nodes = True
+
+    out_node = material.node_tree.nodes.get("Material Output")
+    bsdf_node = material.node_tree.nodes.get("Principled BSDF")
+    material.node_tree.nodes.remove(bsdf_node)
+
+    node_object_info = material.node_tree.nodes.new(type="ShaderNodeObjectInfo")
+    node_object_info.location = -200, 100
+
+    # read the strength from the custom property of the object that is being shaded
+    node_attribute = material.node_tree.nodes.new(type="ShaderNodeAttribute")
+    node_attribute.attribute_type = "OBJECT"
+    node_attribute.attribute_name = strength_property_name
+    node_attribute.location = -200, -100
+
+    node_emission = material.node_tree.nodes.new(type="ShaderNodeEmission")
+    node_emission.location = 0, 0
+
+    material.node_tree.links.new(node_object_info.outputs["Color"], node_emission.inputs["Color"])
+    material.node_tree.links.new(node_attribute.outputs["Fac"], node_emission.inputs["Strength"])
+    material.node_tree.links.new(node_emission.outputs["Emission"], out_node.inputs["Surface"])
+
+    return material
+
+
 def render_loop():
     bpy.ops.render.render(animation=True)
 
@@ -270,8 +345,11 @@ def setup_camera(loc, rot):
     """
     create and setup the camera
     """
-    bpy.ops.object.camera_add(location=loc, rotation=rot)
-    camera = active_object()
+    camera_data = bpy.data.cameras.new(name="Camera")
+    camera = bpy.data.objects.new(name="Camera", object_data=camera_data)
+    bpy.context.collection.objects.link(camera)
+    camera.location = loc
+    camera.rotation_euler = rot
 
     # set the camera as the "active camera" in the scene
     bpy.context.scene.camera = camera
@@ -281,12 +359,12 @@ def setup_camera(loc, rot):
 
     camera.data.passepartout_alpha = 0.9
 
-    empty = track_empty(camera)
+    track_empty(camera)
 
-    bpy.context.object.data.dof.use_dof = True
-    bpy.context.object.data.dof.aperture_fstop = 0.1
+    camera.data.dof.use_dof = True
+    camera.data.dof.aperture_fstop = 0.1
 
-    return empty
+    return camera
 
 
 def set_scene_props(fps, loop_seconds):
@@ -300,8 +378,9 @@ def set_scene_props(fps, loop_seconds):
 
     # set the world background to black
     world = bpy.data.worlds["World"]
-    if "Background" in world.node_tree.nodes:
-        world.node_tree.nodes["Background"].inputs["Color"].default_value = (0, 0, 0, 1)
+    background_node = world.node_tree.nodes.get("Background")
+    if background_node:
+        background_node.inputs["Color"].default_value = (0, 0, 0, 1)
 
     scene.render.fps = fps
 
@@ -338,11 +417,12 @@ def scene_setup(i=0):
 
     loc = (0, 0, 80)
     rot = (0, 0, 0)
-    setup_camera(loc, rot)
+    camera = setup_camera(loc, rot)
 
     context = {
         "frame_count": frame_count,
         "fps": fps,
+        "camera": camera,
     }
 
     return context
@@ -351,30 +431,47 @@ def scene_setup(i=0):
 def create_data_animation_loop(obj, data_path, start_value, mid_value, start_frame, loop_length, linear_extrapolation=True):
     """
     To make a data property loop we need to:
-    1. set the property to an initial value and add a keyframe in the beginning of the loop
-    2. set the property to a middle value and add a keyframe in the middle of the loop
-    3. set the property the initial value and add a keyframe at the end of the loop
+    1. add a keyframe with an initial value in the beginning of the loop
+    2. add a keyframe with a middle value in the middle of the loop
+    3. add a keyframe with the initial value at the end of the loop
+
+    The keyframes are written directly into the F-Curve
+    instead of calling keyframe_insert() three times
     """
+    animated_id = obj.id_data
+    if obj == animated_id:
+        # data paths on a data-block (including custom properties like '["prop"]') are already complete
+        fcurve_data_path = data_path
+    else:
+        fcurve_data_path = obj.path_from_id(data_path)
 
-    # set the start value
-    setattr(obj, data_path, start_value)
-    # add a keyframe at the start
-    obj.keyframe_insert(data_path, frame=start_frame)
+    animation_data = animated_id.animation_data_create()
+    if animation_data.action is None:
+        animation_data.action = bpy.data.actions.new(name=f"{animated_id.name}Action")
+    action = animation_data.action
 
-    # set the middle value
-    setattr(obj, data_path, mid_value)
-    # add a keyframe in the middle
-    mid_frame = start_frame + (loop_length) / 2
-    obj.keyframe_insert(data_path, frame=mid_frame)
+    fcurve = action.fcurves.find(fcurve_data_path)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path=fcurve_data_path)
 
-    # set the end value
-    setattr(obj, data_path, start_value)
-    # add a keyframe in the end
+    mid_frame = start_frame + (loop_length) / 2
     end_frame = start_frame + loop_length
-    obj.keyframe_insert(data_path, frame=end_frame)
+
+    keyframe_points = fcurve.keyframe_points
+    first_index = len(keyframe_points)
+    keyframe_points.add(3)
+
+    # write the coordinates of all the keyframe points in one call
+    keyframe_coords = np.empty(len(keyframe_points) * 2, dtype=np.float32)
+    if first_index:
+        keyframe_points.foreach_get("co", keyframe_coords)
+    keyframe_coords[first_index * 2 :] = (start_frame, start_value, mid_frame, mid_value, end_frame, start_value)
+    keyframe_points.foreach_set("co", keyframe_coords)
+    fcurve.update()
 
     if linear_extrapolation:
-        set_fcurve_extrapolation_to_linear()
+        # use the animated data-block directly instead of reading the active object
+        set_fcurve_extrapolation_to_linear(animated_id)
 
 
 ################################################################
@@ -394,14 +491,14 @@ def calculate_end_frame(context, current_frame):
     return bpy.context.scene.frame_end
 
 
-def animate_depth_of_field(frame_end):
+def animate_depth_of_field(camera, frame_end):
 
     start_focus_distance = 15.0
-    mid_focus_distance = bpy.data.objects["Camera"].location.z / 2
+    mid_focus_distance = camera.location.z / 2
     start_frame = 1
     loop_length = frame_end
     create_data_animation_loop(
-        bpy.data.objects["Camera"].data.dof,
+        camera.data.dof,
         "focus_distance",
         start_focus_distance,
         mid_focus_distance,
@@ -417,20 +514,33 @@ def calculate_phyllotaxis_coordinates(n, angle, scale_fac):
     http://algorithmicbotany.org/papers/abop/abop-ch4.pdf
 
     See tutorial for detailed description: https://youtu.be/aeDbYuJyXr8
+
+    "n" can be a NumPy array of point indices to calculate all the points in one vectorized pass
     """
     # calculate "φ" in formula (4.1) http://algorithmicbotany.org/papers/abop/abop-ch4.pdf
     current_angle = n * angle
 
     # calculate "r" in formula (4.1) http://algorithmicbotany.org/papers/abop/abop-ch4.pdf
-    current_radius = scale_fac * math.sqrt(n)
+    current_radius = scale_fac * np.sqrt(n)
 
     # convert from Polar Coordinates (r,φ) to Cartesian Coordinates (x,y)
-    x = current_radius * math.cos(current_angle)
-    y = current_radius * math.sin(current_angle)
+    x = current_radius * np.cos(current_angle)
+    y = current_radius * np.sin(current_angle)
 
     return x, y
 
 
+def calculate_sphere_schedules(count, angle, scale_fac, first_frame, frame_step):
+    """
+    Precompute the numeric data of all the spheres with NumPy
+    so the sphere loop only needs to write the values into Blender
+    """
+    xs, ys = calculate_phyllotaxis_coordinates(np.arange(count, dtype=np.float64), angle, scale_fac)
+    start_frames = first_frame + np.arange(count) * frame_step
+
+    return xs, ys, start_frames
+
+
 def create_centerpiece(context):
 
     colors = (hex_color_to_rgba("#306998"), hex_color_to_rgba("#FFD43B"))
@@ -446,29 +556,44 @@ def create_centerpiece(context):
     # set angle to the Fibonacci angle 137.5 to get the sunflower pattern
     # angle = math.radians(137.5)
 
-    current_frame = 1
+    first_frame = 1
     frame_step = 0.5
     start_emission_strength_value = 0
     mid_emission_strength_value = 20
     loop_length = 60
 
-    count = 300
-    for n in range(count):
+    # one material is shared by all the spheres,
+    # the color and the emission strength are stored on each sphere object
+    strength_property_name = "emission_strength"
+    strength_data_path = f'["{strength_property_name}"]'
+    material = create_object_color_emission_material(strength_property_name)
+
+    # create the ico sphere mesh once and share it between all the spheres
+    bpy.ops.mesh.primitive_ico_sphere_add(radius=ico_sphere_radius)
+    template_obj = active_object()
+    ico_sphere_mesh = template_obj.data
+    ico_sphere_mesh.materials.append(material)
+    bpy.data.objects.remove(template_obj)
 
-        x, y = calculate_phyllotaxis_coordinates(n, angle, scale_fac)
+    count = 300
+    xs, ys, start_frames = calculate_sphere_schedules(count, angle, scale_fac, first_frame, frame_step)
+    # draw the colors for all the spheres at once
+    color_picks = random.choices(colors, k=count)
+    for n, (x, y, current_frame) in enumerate(zip(xs.tolist(), ys.tolist(), start_frames.tolist())):
 
         # place ico sphere
-        bpy.ops.mesh.primitive_ico_sphere_add(radius=ico_sphere_radius, location=(x, y, 0))
-        obj = active_object()
+        obj = bpy.data.objects.new(name=f"sphr_{n}", object_data=ico_sphere_mesh)
+        obj.location = (x, y, 0)
+        bpy.context.collection.objects.link(obj)
 
-        # assign an emission material
-        material, nodes = create_emission_material(color=random.choice(colors), name=f"{n}_sphr", energy=30, return_nodes=True)
-        obj.data.materials.append(material)
+        # set the color that the shared emission material reads from the Object Info node
+        obj.color = color_picks[n]
+        obj[strength_property_name] = float(start_emission_strength_value)
 
-        # animate the Strength value of the emission material
+        # animate the emission strength custom property of the sphere
         create_data_animation_loop(
-            nodes["Emission"].inputs["Strength"],
-            "default_value",
+            obj,
+            strength_data_path,
             start_emission_strength_value,
             mid_emission_strength_value,
             current_frame,
@@ -476,12 +601,13 @@ def create_centerpiece(context):
             linear_extrapolation=False,
         )
 
-        current_frame += frame_step
+    # evaluate the depsgraph once after all the spheres were created
+    bpy.context.view_layer.update()
 
-    current_frame = int(current_frame + loop_length)
+    current_frame = int(first_frame + count * frame_step + loop_length)
     end_frame = calculate_end_frame(context, current_frame)
 
-    animate_depth_of_field(end_frame)
+    animate_depth_of_field(context["camera"], end_frame)
 
 
 def main():
@@ -3,6 +3,7 @@ import time
 import math
 
 import bpy
+import numpy as np
 
 ################################################################
 # helper functions BEGIN
@@ -43,26 +44,20 @@ def clean_scene():
     if bpy.context.active_object and bpy.context.active_object.mode == "EDIT":
         bpy.ops.object.editmode_toggle()
 
-    # make sure non of the objects are hidden from the viewport, selection, or disabled
-    for obj in bpy.data.objects:
-        obj.hide_set(False)
-        obj.hide_select = False
-        obj.hide_viewport = False
-
-    # select all the object and delete them (just like pressing A + X + D in the viewport)
-    bpy.ops.object.select_all(action="SELECT")
-    bpy.ops.object.delete()
+    # remove all the objects with the data API,
+    # this also removes hidden and disabled objects so there is no need to unhide them first
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
 
     # find all the collections and remove them
-    collection_names = [col.name for col in bpy.data.collections]
-    for name in collection_names:
-        bpy.data.collections.remove(bpy.data.collections[name])
+    # (iterate over a snapshot of the collections so they can be removed while looping)
+    for col in list(bpy.data.collections):
+        bpy.data.collections.remove(col)
 
     # in the case when you modify the world shader
     # delete and recreate the world object
-    world_names = [world.name for world in bpy.data.worlds]
-    for name in world_names:
-        bpy.data.worlds.remove(bpy.data.worlds[name])
+    for world in list(bpy.data.worlds):
+        bpy.data.worlds.remove(world)
     # create a new world data block
     bpy.ops.world.new()
     bpy.context.scene.world = bpy.data.worlds["World"]
@@ -92,21 +87,26 @@ def time_seed():
     return seed
 
 
-def add_ctrl_empty(name=None):
+def add_ctrl_empty(name=None, collection=None):
 
-    bpy.ops.object.empty_add()
-    empty_ctrl = active_object()
+    if not name:
+        name = "empty.cntrl"
 
-    if name:
-        empty_ctrl.name = name
-    else:
-        empty_ctrl.name = "empty.cntrl"
+    if collection is None:
+        collection = bpy.context.collection
+
+    # create the empty with the data API to avoid the operator overhead of bpy.ops.object.empty_add
+    empty_ctrl = bpy.data.objects.new(name=name, object_data=None)
+    empty_ctrl.empty_display_type = "PLAIN_AXES"
+    collection.objects.link(empty_ctrl)
 
     return empty_ctrl
 
 
 def make_active(obj):
-    bpy.ops.object.select_all(action="DESELECT")
+    # only deselect the objects that are selected instead of running the select_all operator
+    for selected_obj in bpy.context.selected_objects:
+        selected_obj.select_set(False)
     obj.select_set(True)
     bpy.context.view_layer.objects.active = obj
 
@@ -209,6 +209,8 @@ def setup_scene(i=0):
 
     # Utility Building Blocks
     clean_scene()
+    # the cached materials were removed with the rest of the scene data
+    _MATERIAL_CACHE.clear()
     set_scene_props(fps, loop_seconds)
 
     loc = (0, 0, 7)
@@ -222,54 +224,84 @@ def setup_scene(i=0):
     return context
 
 
-def make_fcurves_linear():
-    for fcurve in bpy.context.active_object.animation_data.action.fcurves:
-        for points in fcurve.keyframe_points:
-            points.interpolation = "LINEAR"
+# the value of "LINEAR" in the keyframe interpolation enum, used with keyframe_points.foreach_set()
+_LINEAR_INTERPOLATION = 1
+
+
+def make_fcurves_linear(obj=None):
+    if obj is None:
+        obj = bpy.context.active_object
+
+    for fcurve in obj.animation_data.action.fcurves:
+        # set the interpolation of all the keyframes of the F-Curve in one call
+        keyframe_count = len(fcurve.keyframe_points)
+        fcurve.keyframe_points.foreach_set("interpolation", np.full(keyframe_count, _LINEAR_INTERPOLATION, dtype=np.int32))
+
+
+# the color palette is stored once at the module level instead of being rebuilt on every call,
+# the colors are tuples so they can be assigned to default_value and used as dict keys as is
+_PALETTE = [
+    tuple(color)
+    for color in [
+        [0.48046875, 0.171875, 0.5, 0.99609375],
+        [0.3515625, 0.13671875, 0.39453125, 0.99609375],
+        [0.2734375, 0.21484375, 0.08984375, 0.99609375],
+        [0.5625, 0.45703125, 0.234375, 0.99609375],
+        [0.92578125, 0.8828125, 0.77734375, 0.99609375],
+        [0.1640625, 0.4921875, 0.13671875, 0.99609375],
+        [0.453125, 0.74609375, 0.328125, 0.99609375],
+        [0.2734375, 0.21484375, 0.08984375, 0.99609375],
+        [0.5625, 0.45703125, 0.234375, 0.99609375],
+        [0.92578125, 0.8828125, 0.77734375, 0.99609375],
+        [0.1640625, 0.4921875, 0.13671875, 0.99609375],
+        [0.453125, 0.74609375, 0.328125, 0.99609375],
+        [0.00390625, 0.11328125, 0.15625, 0.99609375],
+        [0.0234375, 0.49609375, 0.46875, 0.99609375],
+        [0.01953125, 0.51953125, 0.6953125, 0.99609375],
+        [0, 0.66796875, 0.78515625, 0.99609375],
+        [0, 0.15234375, 0.171875, 0.99609375],
+        [0.3203125, 0, 0.12890625, 0.99609375],
+        [0.56640625, 0, 0.2265625, 0.99609375],
+        [0.99609375, 0, 0.3984375, 0.99609375],
+        [0.9453125, 0.640625, 0.33203125, 0.99609375],
+        [0.51953125, 0.453125, 0.38671875, 0.99609375],
+        [0.84765625, 0.94140625, 0.63671875, 0.99609375],
+        [0.30859375, 0.91796875, 0.59375, 0.99609375],
+        [0.46484375, 0.76171875, 0.47265625, 0.99609375],
+        [0.71875, 0.5390625, 0.546875, 0.99609375],
+        [0.40234375, 0.3671875, 0.30859375, 0.99609375],
+    ]
+]
 
 
 def get_random_color():
-    return random.choice(
-        [
-            [0.48046875, 0.171875, 0.5, 0.99609375],
-            [0.3515625, 0.13671875, 0.39453125, 0.99609375],
-            [0.2734375, 0.21484375, 0.08984375, 0.99609375],
-            [0.5625, 0.45703125, 0.234375, 0.99609375],
-            [0.92578125, 0.8828125, 0.77734375, 0.99609375],
-            [0.1640625, 0.4921875, 0.13671875, 0.99609375],
-            [0.453125, 0.74609375, 0.328125, 0.99609375],
-            [0.2734375, 0.21484375, 0.08984375, 0.99609375],
-            [0.5625, 0.45703125, 0.234375, 0.99609375],
-            [0.92578125, 0.8828125, 0.77734375, 0.99609375],
-            [0.1640625, 0.4921875, 0.13671875, 0.99609375],
-            [0.453125, 0.74609375, 0.328125, 0.99609375],
-            [0.00390625, 0.11328125, 0.15625, 0.99609375],
-            [0.0234375, 0.49609375, 0.46875, 0.99609375],
-            [0.01953125, 0.51953125, 0.6953125, 0.99609375],
-            [0, 0.66796875, 0.78515625, 0.99609375],
-            [0, 0.15234375, 0.171875, 0.99609375],
-            [0.3203125, 0, 0.12890625, 0.99609375],
-            [0.56640625, 0, 0.2265625, 0.99609375],
-            [0.99609375, 0, 0.3984375, 0.99609375],
-            [0.9453125, 0.640625, 0.33203125, 0.99609375],
-            [0.51953125, 0.453125, 0.38671875, 0.99609375],
-            [0.84765625, 0.94140625, 0.63671875, 0.99609375],
-            [0.30859375, 0.91796875, 0.59375, 0.99609375],
-            [0.46484375, 0.76171875, 0.47265625, 0.99609375],
-            [0.71875, 0.5390625, 0.546875, 0.99609375],
-            [0.40234375, 0.3671875, 0.30859375, 0.99609375],
-        ]
-    )
-
-
-def apply_material(obj):
-    color = get_random_color()
-    mat = bpy.data.materials.new(name="Material")
-    mat.use_nodes = True
-    mat.node_tree.nodes["Principled BSDF"].inputs["Base Color"].default_value = color
-    mat.node_tree.nodes["Principled BSDF"].inputs["Specular"].default_value = 0
-
-    obj.data.materials.append(mat)
+    return _PALETTE[random.randrange(len(_PALETTE))]
+
+
+# materials created by apply_material() keyed by their color,
+# so all the objects with the same color share one material
+_MATERIAL_CACHE = {}
+
+
+def apply_material(obj, color=None):
+    if color is None:
+        color = get_random_color()
+    mat = _MATERIAL_CACHE.get(color)
+    if mat is None:
+        mat = bpy.data.materials.new(name="Material")
+        mat.use_nodes = True
+        bsdf_inputs = mat.node_tree.nodes["Principled BSDF"].inputs
+        bsdf_inputs["Base Color"].default_value = color
+        bsdf_inputs["Specular"].default_value = 0
+        _MATERIAL_CACHE[color] = mat
+
+    if obj.material_slots:
+        # the mesh is shared with other objects,
+        # link the material to the object so each object keeps its own color
+        obj.material_slots[0].link = "OBJECT"
+        obj.material_slots[0].material = mat
+    else:
+        obj.data.materials.append(mat)
 
 
 def add_lights():
@@ -282,42 +314,97 @@ def add_lights():
 ################################################################
 
 
-def create_circle_control_empty():
-    empty = add_ctrl_empty(name=f"empty.circle.cntrl")
-    empty.rotation_euler.z = math.radians(random.uniform(0, 360))
-    empty.location.z = random.uniform(-3, 1)
+def create_circle_control_empty(z_rotation, z_location, collection=None):
+    empty = add_ctrl_empty(name=f"empty.circle.cntrl", collection=collection)
+    empty.rotation_euler.z = z_rotation
+    empty.location.z = z_location
     return empty
 
 
-def animate_object_translation(context, obj):
-    frame = random.randint(-context["frame_count"], 0)
-    obj.location.x = 0
-    obj.keyframe_insert("location", frame=frame)
+def animate_object_translation(context, obj, start_frame, end_x):
+    end_frame = start_frame + context["frame_count"]
 
-    frame += context["frame_count"]
+    start_location = (0, obj.location.y, obj.location.z)
+    end_location = (end_x, obj.location.y, obj.location.z)
+    obj.location = end_location
 
-    obj.location.x = random.uniform(5, 5.5)
-    obj.keyframe_insert("location", frame=frame)
+    # create the location F-Curves directly instead of calling keyframe_insert() for every keyframe
+    action = bpy.data.actions.new(name=f"{obj.name}Action")
+    obj.animation_data_create().action = action
 
-    fcurves = obj.animation_data.action.fcurves
-    location_fcurve = fcurves.find("location")
-    location_fcurve.modifiers.new(type="CYCLES")
+    location_fcurves = []
+    for axis in range(3):
+        fcurve = action.fcurves.new("location", index=axis, action_group="Object Transforms")
+        fcurve.keyframe_points.add(2)
+        fcurve.keyframe_points.foreach_set(
+            "co",
+            np.array([start_frame, start_location[axis], end_frame, end_location[axis]], dtype=np.float32),
+        )
+        # set the interpolation while creating the keyframes instead of calling make_fcurves_linear()
+        fcurve.keyframe_points.foreach_set("interpolation", np.full(2, _LINEAR_INTERPOLATION, dtype=np.int32))
+        fcurve.update()
+        location_fcurves.append(fcurve)
 
-    make_fcurves_linear()
+    # loop the X location, use the F-Curve reference directly instead of searching the action for it
+    location_x_fcurve = location_fcurves[0]
+    location_x_fcurve.modifiers.new(type="CYCLES")
+
+
+def create_circle_template_mesh():
+    """
+    Create the circle mesh once so it can be shared by all the circle objects
+    """
+    bpy.ops.mesh.primitive_circle_add(radius=0.1, fill_type="TRIFAN")
+    template_obj = active_object()
+    template_mesh = template_obj.data
+    # add an empty material slot, the material is linked on the object level
+    template_mesh.materials.append(None)
+    bpy.data.objects.remove(template_obj)
+
+    return template_mesh
+
+
+def gen_circle_params(context, count):
+    """
+    Draw the random parameters of all the circles at once with NumPy
+
+    The NumPy generator is seeded from the random module,
+    so the result is still reproducible with the seed set in setup_scene()
+    """
+    rng = np.random.default_rng(random.getrandbits(64))
+
+    start_frames = rng.integers(-context["frame_count"], 0, size=count, endpoint=True)
+    end_xs = rng.uniform(5, 5.5, size=count)
+    z_locations = rng.uniform(-3, 1, size=count)
+    z_rotations = rng.uniform(0, 2 * math.pi, size=count)
+    palette_indices = rng.integers(0, len(_PALETTE), size=count)
+
+    return start_frames.tolist(), end_xs.tolist(), z_locations.tolist(), z_rotations.tolist(), palette_indices.tolist()
 
 
 def gen_centerpiece(context):
 
-    for _ in range(500):
-        empty = create_circle_control_empty()
+    circle_count = 500
+    start_frames, end_xs, z_locations, z_rotations, palette_indices = gen_circle_params(context, circle_count)
+
+    template_mesh = create_circle_template_mesh()
+
+    # build the circles in a collection that is not linked to the scene yet,
+    # so the scene is only updated once when the collection is linked after the loop
+    circle_collection = bpy.data.collections.new("circles")
 
-        bpy.ops.mesh.primitive_circle_add(radius=0.1, fill_type="TRIFAN")
-        circle = active_object()
+    for i in range(circle_count):
+        empty = create_circle_control_empty(z_rotations[i], z_locations[i], collection=circle_collection)
+
+        circle = bpy.data.objects.new(f"circle.{i}", template_mesh)
+        circle_collection.objects.link(circle)
         circle.parent = empty
 
-        apply_material(circle)
+        apply_material(circle, _PALETTE[palette_indices[i]])
+
+        animate_object_translation(context, circle, start_frames[i], end_xs[i])
 
-        animate_object_translation(context, circle)
+    bpy.context.scene.collection.children.link(circle_collection)
 
 
 def main():
@@ -6,6 +6,7 @@ import random
 import time
 
 import bpy
+import numpy as np
 
 
 ################################################################
@@ -45,26 +46,20 @@ def clean_scene():
     if bpy.context.active_object and bpy.context.active_object.mode == "EDIT":
         bpy.ops.object.editmode_toggle()
 
-    # make sure non of the objects are hidden from the viewport, selection, or disabled
-    for obj in bpy.data.objects:
-        obj.hide_set(False)
-        obj.hide_select = False
-        obj.hide_viewport = False
-
-    # select all the object and delete them (just like pressing A + X + D in the viewport)
-    bpy.ops.object.select_all(action="SELECT")
-    bpy.ops.object.delete()
+    # remove all the objects with the data API,
+    # this also removes hidden and disabled objects so there is no need to unhide them first
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
 
     # find all the collections and remove them
-    collection_names = [col.name for col in bpy.data.collections]
-    for name in collection_names:
-        bpy.data.collections.remove(bpy.data.collections[name])
+    # (iterate over a snapshot of the collections so they can be removed while looping)
+    for col in list(bpy.data.collections):
+        bpy.data.collections.remove(col)
 
     # in the case when you modify the world shader
     # delete and recreate the world object
-    world_names = [world.name for world in bpy.data.worlds]
-    for name in world_names:
-        bpy.data.worlds.remove(bpy.data.worlds[name])
+    for world in list(bpy.data.worlds):
+        bpy.data.worlds.remove(world)
     # create a new world data block
     bpy.ops.world.new()
     bpy.context.scene.world = bpy.data.worlds["World"]
@@ -102,29 +97,45 @@ def set_fcurve_extrapolation_to_linear():
 def create_data_animation_loop(obj, data_path, start_value, mid_value, start_frame, loop_length, linear_extrapolation=True):
     """
     To make a data property loop we need to:
-    1. set the property to an initial value and add a keyframe in the beginning of the loop
-    2. set the property to a middle value and add a keyframe in the middle of the loop
-    3. set the property the initial value and add a keyframe at the end of the loop
+    1. add a keyframe with an initial value in the beginning of the loop
+    2. add a keyframe with a middle value in the middle of the loop
+    3. add a keyframe with the initial value at the end of the loop
+
+    The keyframes are written directly into the F-Curve
+    instead of calling keyframe_insert() three times
     """
-    # set the start value
-    setattr(obj, data_path, start_value)
-    # add a keyframe at the start
-    obj.keyframe_insert(data_path, frame=start_frame)
-
-    # set the middle value
-    setattr(obj, data_path, mid_value)
-    # add a keyframe in the middle
-    mid_frame = start_frame + (loop_length) / 2
-    obj.keyframe_insert(data_path, frame=mid_frame)
+    animated_id = obj.id_data
+    fcurve_data_path = obj.path_from_id(data_path)
 
-    # set the end value
-    setattr(obj, data_path, start_value)
-    # add a keyframe in the end
+    animation_data = animated_id.animation_data_create()
+    if animation_data.action is None:
+        animation_data.action = bpy.data.actions.new(name=f"{animated_id.name}Action")
+    action = animation_data.action
+
+    fcurve = action.fcurves.find(fcurve_data_path)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path=fcurve_data_path)
+
+    mid_frame = start_frame + (loop_length) / 2
     end_frame = start_frame + loop_length
-    obj.keyframe_insert(data_path, frame=end_frame)
+
+    keyframe_points = fcurve.keyframe_points
+    first_index = len(keyframe_points)
+    keyframe_points.add(3)
+
+    # write the coordinates of all the keyframe points in one call
+    keyframe_coords = np.empty(len(keyframe_points) * 2, dtype=np.float32)
+    if first_index:
+        keyframe_points.foreach_get("co", keyframe_coords)
+    keyframe_coords[first_index * 2 :] = (start_frame, start_value, mid_frame, mid_value, end_frame, start_value)
+    keyframe_points.foreach_set("co", keyframe_coords)
+    fcurve.update()
 
     if linear_extrapolation:
-        set_fcurve_extrapolation_to_linear()
+        # set the extrapolation on the F-Curve directly instead of looping over all the F-Curves of the active object
+        fcurve.extrapolation = "LINEAR"
+
+    return fcurve
 
 
 def set_scene_props(fps, frame_count):
@@ -182,14 +193,23 @@ def create_node(node_tree, type_name, node_x_location, node_location_step_x=0, n
     return node_obj, node_x_location
 
 
+# index of the BOOLEAN output socket of the Random Value node,
+# the output sockets of the node don't change so we only need to look it up once
+_BOOL_SOCKET_INDEX = None
+
+
 def create_random_bool_value_node(node_tree, node_x_location, node_y_location):
+    global _BOOL_SOCKET_INDEX
+
     separate_geo_random_value_node, node_x_location = create_node(node_tree, "FunctionNodeRandomValue", node_x_location, node_y_location=node_y_location)
     target_output_type = "BOOLEAN"
     separate_geo_random_value_node.data_type = target_output_type
 
-    random_value_node_output_lookup = {socket.type: socket for socket in separate_geo_random_value_node.outputs.values()}
+    outputs = separate_geo_random_value_node.outputs
+    if _BOOL_SOCKET_INDEX is None:
+        _BOOL_SOCKET_INDEX = next(index for index, socket in enumerate(outputs) if socket.type == target_output_type)
 
-    target_output_socket = random_value_node_output_lookup[target_output_type]
+    target_output_socket = outputs[_BOOL_SOCKET_INDEX]
     return target_output_socket
 
 
@@ -214,7 +234,7 @@ def create_scale_element_geo_node(node_tree, geo_selection_node_output, node_x_l
 
     start_frame = random.randint(0, 150)
 
-    create_data_animation_loop(
+    scale_fcurve = create_data_animation_loop(
         scale_elements_node.inputs["Scale"],
         "default_value",
         start_value=0.0,
@@ -230,7 +250,7 @@ def create_scale_element_geo_node(node_tree, geo_selection_node_output, node_x_l
     to_node = scale_elements_node
     node_tree.links.new(geo_selection_node_output, to_node.inputs["Geometry"])
 
-    return scale_elements_node
+    return scale_elements_node, scale_fcurve
 
 
 def separate_faces_and_animate_scale(node_tree, node_x_location, node_location_step_x):
@@ -238,13 +258,17 @@ def separate_faces_and_animate_scale(node_tree, node_x_location, node_location_s
     separate_geometry_node, node_x_location = create_separate_geo_node(node_tree, node_x_location, node_location_step_x)
 
     scale_elements_geo_nodes = []
-    top_scale_elements_node = create_scale_element_geo_node(node_tree, separate_geometry_node.outputs["Selection"], node_x_location, node_y_location=200)
+    scale_fcurves = []
+    top_scale_elements_node, top_scale_fcurve = create_scale_element_geo_node(node_tree, separate_geometry_node.outputs["Selection"], node_x_location, node_y_location=200)
     scale_elements_geo_nodes.append(top_scale_elements_node)
+    scale_fcurves.append(top_scale_fcurve)
 
-    bottom_scale_elements_node = create_scale_element_geo_node(node_tree, separate_geometry_node.outputs["Inverted"], node_x_location, node_y_location=-200)
+    bottom_scale_elements_node, bottom_scale_fcurve = create_scale_element_geo_node(node_tree, separate_geometry_node.outputs["Inverted"], node_x_location, node_y_location=-200)
     scale_elements_geo_nodes.append(bottom_scale_elements_node)
+    scale_fcurves.append(bottom_scale_fcurve)
 
-    for fcurve in node_tree.animation_data.action.fcurves.values():
+    # loop only the F-Curves that were just created instead of all the F-Curves in the action
+    for fcurve in scale_fcurves:
         fcurve.modifiers.new(type="CYCLES")
 
     node_x_location += node_location_step_x
@@ -3,6 +3,7 @@ import time
 import math
 
 import bpy
+import numpy as np
 
 ################################################################
 # helper functions BEGIN
@@ -21,10 +22,11 @@ def purge_orphans():
         bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
     else:
         # run this only for Blender versions lower than 3.0
-        # call purge_orphans() recursively until there are no more orphan data blocks to purge
-        result = bpy.ops.outliner.orphans_purge()
-        if result.pop() != "CANCELLED":
-            purge_orphans()
+        # call the purge operator in a loop until there are no more orphan data blocks to purge
+        while True:
+            result = bpy.ops.outliner.orphans_purge()
+            if result.pop() == "CANCELLED":
+                break
 
 
 def clean_scene():
@@ -52,15 +54,14 @@ def clean_scene():
     bpy.ops.object.delete()
 
     # find all the collections and remove them
-    collection_names = [col.name for col in bpy.data.collections]
-    for name in collection_names:
-        bpy.data.collections.remove(bpy.data.collections[name])
+    # (iterate over a snapshot of the collections so they can be removed while looping)
+    for col in list(bpy.data.collections):
+        bpy.data.collections.remove(col)
 
     # in the case when you modify the world shader
     # delete and recreate the world object
-    world_names = [world.name for world in bpy.data.worlds]
-    for name in world_names:
-        bpy.data.worlds.remove(bpy.data.worlds[name])
+    for world in list(bpy.data.worlds):
+        bpy.data.worlds.remove(world)
     # create a new world data block
     bpy.ops.world.new()
     bpy.context.scene.world = bpy.data.worlds["World"]
@@ -86,25 +87,25 @@ def hex_color_to_rgb(hex_color):
 
     assert len(hex_color) == 6, f"RRGGBB is the supported hex color format: {hex_color}"
 
+    # parsing all the color components at once - RRGGBB
+    rgb = int(hex_color, 16)
+
     # extracting the Red color component - RRxxxx
-    red = int(hex_color[:2], 16)
-    # dividing by 255 to get a number between 0.0 and 1.0
-    srgb_red = red / 255
-    linear_red = convert_srgb_to_linear_rgb(srgb_red)
+    red = (rgb >> 16) & 0xFF
+    # looking up the precomputed Linear RGB value of the 8-bit component
+    linear_red = _SRGB_TO_LINEAR_LUT[red]
 
     # extracting the Green color component - xxGGxx
-    green = int(hex_color[2:4], 16)
-    # dividing by 255 to get a number between 0.0 and 1.0
-    srgb_green = green / 255
-    linear_green = convert_srgb_to_linear_rgb(srgb_green)
+    green = (rgb >> 8) & 0xFF
+    # looking up the precomputed Linear RGB value of the 8-bit component
+    linear_green = _SRGB_TO_LINEAR_LUT[green]
 
     # extracting the Blue color component - xxxxBB
-    blue = int(hex_color[4:6], 16)
-    # dividing by 255 to get a number between 0.0 and 1.0
-    srgb_blue = blue / 255
-    linear_blue = convert_srgb_to_linear_rgb(srgb_blue)
+    blue = rgb & 0xFF
+    # looking up the precomputed Linear RGB value of the 8-bit component
+    linear_blue = _SRGB_TO_LINEAR_LUT[blue]
 
-    return tuple([linear_red, linear_green, linear_blue])
+    return (linear_red, linear_green, linear_blue)
 
 
 def hex_color_to_rgba(hex_color, alpha=1.0):
@@ -117,7 +118,7 @@ def hex_color_to_rgba(hex_color, alpha=1.0):
     Video tutorial: https://www.youtube.com/watch?v=knc1CGBhJeU
     """
     linear_red, linear_green, linear_blue = hex_color_to_rgb(hex_color)
-    return tuple([linear_red, linear_green, linear_blue, alpha])
+    return (linear_red, linear_green, linear_blue, alpha)
 
 
 def convert_srgb_to_linear_rgb(srgb_color_component):
@@ -130,11 +131,30 @@ def convert_srgb_to_linear_rgb(srgb_color_component):
     if srgb_color_component <= 0.04045:
         linear_color_component = srgb_color_component / 12.92
     else:
-        linear_color_component = math.pow((srgb_color_component + 0.055) / 1.055, 2.4)
+        linear_color_component = ((srgb_color_component + 0.055) / 1.055) ** 2.4
 
     return linear_color_component
 
 
+def convert_srgb_to_linear_rgb_array(srgb_color_components):
+    """
+    Converting a NumPy array of sRGB color components to Linear RGB in one vectorized pass
+
+    Same formula as convert_srgb_to_linear_rgb() but without the branch,
+    both sides are calculated and np.where() selects the result for each component
+    """
+    return np.where(
+        srgb_color_components <= 0.04045,
+        srgb_color_components / 12.92,
+        np.power((srgb_color_components + 0.055) / 1.055, 2.4),
+    )
+
+
+# a hex color component is always one of 256 values,
+# so the sRGB to Linear RGB conversion is precomputed once for all of them
+_SRGB_TO_LINEAR_LUT = tuple(convert_srgb_to_linear_rgb_array(np.arange(256) / 255).tolist())
+
+
 def active_object():
     """
     returns the active object
@@ -142,14 +162,19 @@ def active_object():
     return bpy.context.active_object
 
 
+# the random number generator used by the script,
+# a private instance keeps its state separate from other code using the global random module
+_RNG = random.Random()
+
+
 def time_seed():
     """
     Sets the random seed based on the time
     and copies the seed into the clipboard
     """
-    seed = time.time()
+    seed = time.time_ns()
     print(f"seed: {seed}")
-    random.seed(seed)
+    _RNG.seed(seed)
 
     # add the seed value to your clipboard
     bpy.context.window_manager.clipboard = str(seed)
@@ -171,7 +196,9 @@ def add_ctrl_empty(name=None):
 
 
 def make_active(obj):
-    bpy.ops.object.select_all(action="DESELECT")
+    # deselect only the selected objects instead of running the select_all operator on every object
+    for selected_obj in bpy.context.selected_objects:
+        selected_obj.select_set(False)
     obj.select_set(True)
     bpy.context.view_layer.objects.active = obj
 
@@ -228,27 +255,29 @@ def set_scene_props(fps, loop_seconds):
     frame_count = fps * loop_seconds
 
     scene = bpy.context.scene
+    eevee = scene.eevee
     scene.frame_end = frame_count
 
     # set the world background to black
-    world = bpy.data.worlds["World"]
-    if "Background" in world.node_tree.nodes:
-        world.node_tree.nodes["Background"].inputs[0].default_value = (0, 0, 0, 1)
+    world_nodes = bpy.data.worlds["World"].node_tree.nodes
+    background_node = world_nodes.get("Background")
+    if background_node:
+        background_node.inputs[0].default_value = (0, 0, 0, 1)
 
     scene.render.fps = fps
 
     scene.frame_current = 1
     scene.frame_start = 1
 
-    scene.eevee.use_bloom = True
-    scene.eevee.bloom_intensity = 0.005
+    eevee.use_bloom = True
+    eevee.bloom_intensity = 0.005
 
     # set Ambient Occlusion properties
-    scene.eevee.use_gtao = True
-    scene.eevee.gtao_distance = 4
-    scene.eevee.gtao_factor = 5
+    eevee.use_gtao = True
+    eevee.gtao_distance = 4
+    eevee.gtao_factor = 5
 
-    scene.eevee.taa_render_samples = 64
+    eevee.taa_render_samples = 64
 
     scene.view_settings.look = "Very High Contrast"
 
@@ -267,7 +296,7 @@ def scene_setup(i=0):
 
     seed = 0
     if seed:
-        random.seed(seed)
+        _RNG.seed(seed)
     else:
         time_seed()
 
@@ -287,6 +316,10 @@ def scene_setup(i=0):
     return context
 
 
+# the value of "BOUNCE" in the keyframe interpolation enum, used with keyframe_points.foreach_set()
+_BOUNCE_INTERPOLATION = 4
+
+
 def make_fcurves_bounce():
     for fcurve in bpy.context.active_object.animation_data.action.fcurves:
         for kf in fcurve.keyframe_points:
@@ -297,54 +330,61 @@ def render_loop():
     bpy.ops.render.render(animation=True)
 
 
+# the palettes are converted to Linear RGB once when the script is loaded
+# instead of converting the picked hex color on every call
+_PALETTE_RGBA = tuple(
+    hex_color_to_rgba(hex_color)
+    for hex_color in [
+        "#846295",
+        "#B369AC",
+        "#BFB3CB",
+        "#E3E0E7",
+        "#F3F0E5",
+        "#557E5F",
+        "#739D87",
+        "#C3CDB1",
+        "#7F8BC3",
+        "#0D2277",
+        "#72ED72",
+        "#40D4BC",
+        "#7EADF0",
+        "#EAEC71",
+        "#C4C55D",
+        "#EDE1D4",
+        "#DBCBBD",
+        "#A98E8E",
+        "#676F84",
+        "#4F5D6B",
+        "#990065",
+        "#C60083",
+        "#FF00A9",
+        "#F9D19C",
+        "#BFB3A7",
+        "#B3A598",
+        "#998995",
+        "#99A1A3",
+        "#74817F",
+        "#815D6D",
+    ]
+)
+
+_HIGHLIGHT_RGB = tuple(
+    hex_color_to_rgb(hex_color)
+    for hex_color in [
+        "#CB5A0C",
+        "#DBF227",
+        "#22BABB",
+        "#FFEC5C",
+    ]
+)
+
+
 def get_random_color():
-    hex_color = random.choice(
-        [
-            "#846295",
-            "#B369AC",
-            "#BFB3CB",
-            "#E3E0E7",
-            "#F3F0E5",
-            "#557E5F",
-            "#739D87",
-            "#C3CDB1",
-            "#7F8BC3",
-            "#0D2277",
-            "#72ED72",
-            "#40D4BC",
-            "#7EADF0",
-            "#EAEC71",
-            "#C4C55D",
-            "#EDE1D4",
-            "#DBCBBD",
-            "#A98E8E",
-            "#676F84",
-            "#4F5D6B",
-            "#990065",
-            "#C60083",
-            "#FF00A9",
-            "#F9D19C",
-            "#BFB3A7",
-            "#B3A598",
-            "#998995",
-            "#99A1A3",
-            "#74817F",
-            "#815D6D",
-        ]
-    )
-    return hex_color_to_rgba(hex_color)
+    return _RNG.choice(_PALETTE_RGBA)
 
 
 def get_random_highlight_color():
-    hex_color = random.choice(
-        [
-            "#CB5A0C",
-            "#DBF227",
-            "#22BABB",
-            "#FFEC5C",
-        ]
-    )
-    return hex_color_to_rgb(hex_color)
+    return _RNG.choice(_HIGHLIGHT_RGB)
 
 
 def add_lights():
@@ -354,7 +394,7 @@ def add_lights():
     sun_light = active_object()
     sun_light.data.energy = 1.5
 
-    if random.randint(0, 1):
+    if _RNG.randint(0, 1):
         bpy.ops.object.light_add(type="AREA")
         area_light = active_object()
         area_light.scale *= 5
@@ -363,7 +403,7 @@ def add_lights():
 
         euler_x_rotation = math.radians(180)
         z_location = -4
-        if random.randint(0, 1):
+        if _RNG.randint(0, 1):
             euler_x_rotation = 0
             z_location = 4
 
@@ -391,36 +431,78 @@ def apply_material(obj, material):
 ################################################################
 
 
+# the rotation angles are the same for every ring, so they are converted to radians once
+_RAD_180 = math.radians(180)
+_RAD_120 = math.radians(120)
+_RAD_NEG90 = math.radians(-90)
+
+
 def animate_rotation(context, obj, i, frame_offset):
     start_frame = 10 + i * frame_offset
-    obj.keyframe_insert("rotation_euler", frame=start_frame)
+    start_rotation = tuple(obj.rotation_euler)
 
     # rotate mesh about the z-axis
-    degrees = 180
-    radians = math.radians(degrees)
-    obj.rotation_euler.z = radians
+    obj.rotation_euler.z = _RAD_180
 
     # rotate mesh about the y-axis
-    degrees = 120
-    radians = math.radians(degrees)
-    obj.rotation_euler.y = radians
+    obj.rotation_euler.y = _RAD_120
 
     end_frame = context["frame_count"] - 10
-    obj.keyframe_insert("rotation_euler", frame=end_frame)
+    end_rotation = tuple(obj.rotation_euler)
 
-    make_fcurves_bounce()
+    # create the rotation F-Curves directly instead of calling keyframe_insert() for every keyframe
+    action = bpy.data.actions.new(name=f"{obj.name}Action")
+    obj.animation_data_create().action = action
 
+    for axis in range(3):
+        fcurve = action.fcurves.new("rotation_euler", index=axis, action_group="Object Transforms")
+        fcurve.keyframe_points.add(2)
+        fcurve.keyframe_points.foreach_set(
+            "co",
+            np.array([start_frame, start_rotation[axis], end_frame, end_rotation[axis]], dtype=np.float32),
+        )
+        # set the interpolation while creating the keyframes instead of calling make_fcurves_bounce()
+        fcurve.keyframe_points.foreach_set("interpolation", np.full(2, _BOUNCE_INTERPOLATION, dtype=np.int32))
+        fcurve.update()
 
-def create_bevel(obj):
-    # convert mesh into a curve
-    bpy.ops.object.convert(target="CURVE")
 
+def create_bevel(obj):
     # add bevel to curve
     obj.data.bevel_depth = 0.025
     obj.data.bevel_resolution = 16
 
-    # shade smooth
-    bpy.ops.object.shade_smooth()
+    # shade smooth, same as bpy.ops.object.shade_smooth() on a curve object
+    for spline in obj.data.splines:
+        spline.use_smooth = True
+
+
+# the points of a hexagon with a radius of 1 in the same order as converting
+# bpy.ops.mesh.primitive_circle_add(vertices=6) into a curve,
+# the conversion walks the circle backwards starting at the first vertex (0, 5, 4, ..., 1)
+# so the angle of every point is negated,
+# the fourth component is the weight of the curve point
+_HEX_ANGLES = -np.arange(6) * 2 * np.pi / 6
+_UNIT_HEX_POINTS = np.column_stack((-np.sin(_HEX_ANGLES), np.cos(_HEX_ANGLES), np.zeros(6), np.ones(6))).astype(np.float32)
+
+
+def create_hex_ring_curve(radius):
+    """
+    Create a curve with the same hexagon outline as converting
+    bpy.ops.mesh.primitive_circle_add(vertices=6, radius=radius) into a curve
+    without the operator overhead
+    """
+    curve_data = bpy.data.curves.new(name="Circle", type="CURVE")
+    curve_data.dimensions = "3D"
+
+    spline = curve_data.splines.new("POLY")
+    # write all the point coordinates in one call
+    spline.points.add(len(_UNIT_HEX_POINTS) - 1)
+    hex_points = _UNIT_HEX_POINTS.copy()
+    hex_points[:, :3] *= radius
+    spline.points.foreach_set("co", hex_points.ravel())
+    spline.use_cyclic_u = True
+
+    return curve_data
 
 
 def create_centerpiece(context):
@@ -433,17 +515,13 @@ def create_centerpiece(context):
     # repeat number_of_shapes times
     for i in range(1, number_of_shapes):
 
-        # add a mesh into the scene
+        # add a curve into the scene
         current_radius = i * radius_step
-        bpy.ops.mesh.primitive_circle_add(vertices=6, radius=current_radius)
-
-        # get a reference to the currently active object
-        shape_obj = active_object()
+        shape_obj = bpy.data.objects.new(name="Circle", object_data=create_hex_ring_curve(radius=current_radius))
+        bpy.context.collection.objects.link(shape_obj)
 
         # rotate mesh about the x-axis
-        degrees = -90
-        radians = math.radians(degrees)
-        shape_obj.rotation_euler.x = radians
+        shape_obj.rotation_euler.x = _RAD_NEG90
 
         animate_rotation(context, shape_obj, i, frame_offset)
 
@@ -451,6 +529,9 @@ def create_centerpiece(context):
 
         apply_material(shape_obj, context["material"])
 
+    # evaluate the scene once after all the rings are built
+    bpy.context.view_layer.update()
+
 
 def main():
     """
@@ -2,7 +2,10 @@
 Python code to generate this animation
 https://www.artstation.com/artwork/g2A5rZ
 """
+import argparse
+import functools
 import random
+import sys
 import time
 import pprint
 import math
@@ -11,6 +14,7 @@ import math
 import addon_utils
 import mathutils
 import bpy
+import numpy as np
 
 ################################################################
 # region helper functions BEGIN
@@ -29,10 +33,27 @@ def purge_orphans():
         bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
     else:
         # run this only for Blender versions lower than 3.0
-        # call purge_orphans() recursively until there are no more orphan data blocks to purge
-        result = bpy.ops.outliner.orphans_purge()
-        if result.pop() != "CANCELLED":
-            purge_orphans()
+        # remove the data blocks without users directly instead of calling the purge operator,
+        # removing a data block can leave other data blocks without users so sweep until nothing is removed
+        data_collections = (
+            bpy.data.meshes,
+            bpy.data.materials,
+            bpy.data.textures,
+            bpy.data.images,
+            bpy.data.curves,
+            bpy.data.actions,
+            bpy.data.node_groups,
+            bpy.data.worlds,
+            bpy.data.cameras,
+            bpy.data.lights,
+        )
+        removed_count = 1
+        while removed_count:
+            removed_count = 0
+            for data_collection in data_collections:
+                for data_block in [data_block for data_block in data_collection if data_block.users == 0]:
+                    data_collection.remove(data_block)
+                    removed_count += 1
 
 
 def clean_scene():
@@ -49,26 +70,21 @@ def clean_scene():
     if bpy.context.active_object and bpy.context.active_object.mode == "EDIT":
         bpy.ops.object.editmode_toggle()
 
-    # make sure non of the objects are hidden from the viewport, selection, or disabled
-    for obj in bpy.data.objects:
-        obj.hide_set(False)
-        obj.hide_select = False
-        obj.hide_viewport = False
-
-    # select all the object and delete them (just like pressing A + X + D in the viewport)
-    bpy.ops.object.select_all(action="SELECT")
-    bpy.ops.object.delete()
+    # remove all the objects with the data API,
+    # this also removes hidden and disabled objects so there is no need to unhide them first
+    remove_object = bpy.data.objects.remove
+    for obj in list(bpy.data.objects):
+        remove_object(obj, do_unlink=True)
 
     # find all the collections and remove them
-    collection_names = [col.name for col in bpy.data.collections]
-    for name in collection_names:
-        bpy.data.collections.remove(bpy.data.collections[name])
+    # (iterate over a snapshot of the collections so they can be removed while looping)
+    for col in list(bpy.data.collections):
+        bpy.data.collections.remove(col)
 
     # in the case when you modify the world shader
     # delete and recreate the world object
-    world_names = [world.name for world in bpy.data.worlds]
-    for name in world_names:
-        bpy.data.worlds.remove(bpy.data.worlds[name])
+    for world in list(bpy.data.worlds):
+        bpy.data.worlds.remove(world)
     # create a new world data block
     bpy.ops.world.new()
     bpy.context.scene.world = bpy.data.worlds["World"]
@@ -101,36 +117,41 @@ def active_object():
     return bpy.context.active_object
 
 
-def time_seed():
+def time_seed(copy_to_clipboard=False):
     """
     Sets the random seed based on the time
-    and copies the seed into the clipboard
+    and optionally copies the seed into the clipboard
+
+    The seed is an integer so it can be passed back to the script with --seed
     """
-    seed = time.time()
+    seed = time.time_ns()
     print(f"seed: {seed}")
     random.seed(seed)
 
-    # add the seed value to your clipboard
-    bpy.context.window_manager.clipboard = str(seed)
+    if copy_to_clipboard:
+        # add the seed value to your clipboard
+        bpy.context.window_manager.clipboard = str(seed)
 
     return seed
 
 
 def add_ctrl_empty(name=None):
 
-    bpy.ops.object.empty_add(type="PLAIN_AXES", align="WORLD")
-    empty_ctrl = active_object()
+    if not name:
+        name = "empty.cntrl"
 
-    if name:
-        empty_ctrl.name = name
-    else:
-        empty_ctrl.name = "empty.cntrl"
+    # create the empty with the data API to avoid the operator overhead of bpy.ops.object.empty_add
+    empty_ctrl = bpy.data.objects.new(name=name, object_data=None)
+    empty_ctrl.empty_display_type = "PLAIN_AXES"
+    bpy.context.collection.objects.link(empty_ctrl)
 
     return empty_ctrl
 
 
 def make_active(obj):
-    bpy.ops.object.select_all(action="DESELECT")
+    # deselect only the selected objects instead of running the select_all operator on every object
+    for selected_obj in bpy.context.selected_objects:
+        selected_obj.select_set(False)
     obj.select_set(True)
     bpy.context.view_layer.objects.active = obj
 
@@ -179,27 +200,40 @@ def hex_color_to_rgb(hex_color):
 
     assert len(hex_color) == 6, f"RRGGBB is the supported hex color format: {hex_color}"
 
+    # the '#' symbol is removed before the cache lookup,
+    # so "#RRGGBB" and "RRGGBB" share the same cache entry
+    return _hex_triplet_to_linear_rgb(hex_color)
+
+
+@functools.lru_cache(maxsize=512)
+def _hex_triplet_to_linear_rgb(hex_color):
+    """
+    Converting a "RRGGBB" hex triplet to a Linear RGB
+
+    Note: the results are cached since the same few palette colors are converted over and over
+    """
+    # parsing all the color components at once - RRGGBB
+    rgb = int(hex_color, 16)
+
     # extracting the Red color component - RRxxxx
-    red = int(hex_color[:2], 16)
-    # dividing by 255 to get a number between 0.0 and 1.0
-    srgb_red = red / 255
-    linear_red = convert_srgb_to_linear_rgb(srgb_red)
+    red = (rgb >> 16) & 0xFF
+    # looking up the precomputed Linear RGB value of the 8-bit component
+    linear_red = _SRGB_TO_LINEAR_LUT[red]
 
     # extracting the Green color component - xxGGxx
-    green = int(hex_color[2:4], 16)
-    # dividing by 255 to get a number between 0.0 and 1.0
-    srgb_green = green / 255
-    linear_green = convert_srgb_to_linear_rgb(srgb_green)
+    green = (rgb >> 8) & 0xFF
+    # looking up the precomputed Linear RGB value of the 8-bit component
+    linear_green = _SRGB_TO_LINEAR_LUT[green]
 
     # extracting the Blue color component - xxxxBB
-    blue = int(hex_color[4:6], 16)
-    # dividing by 255 to get a number between 0.0 and 1.0
-    srgb_blue = blue / 255
-    linear_blue = convert_srgb_to_linear_rgb(srgb_blue)
+    blue = rgb & 0xFF
+    # looking up the precomputed Linear RGB value of the 8-bit component
+    linear_blue = _SRGB_TO_LINEAR_LUT[blue]
 
     return tuple([linear_red, linear_green, linear_blue])
 
 
+@functools.lru_cache(maxsize=512)
 def hex_color_to_rgba(hex_color, alpha=1.0):
     """
     Converting from a color in the form of a hex triplet string (en.wikipedia.org/wiki/Web_colors#Hex_triplet)
@@ -207,6 +241,8 @@ def hex_color_to_rgba(hex_color, alpha=1.0):
 
     Supports: "#RRGGBB" or "RRGGBB"
 
+    Note: the results are cached since the same few palette colors are converted over and over
+
     Video Tutorial: https://www.youtube.com/watch?v=knc1CGBhJeU
     """
     linear_red, linear_green, linear_blue = hex_color_to_rgb(hex_color)
@@ -228,6 +264,25 @@ def convert_srgb_to_linear_rgb(srgb_color_component):
     return linear_color_component
 
 
+def convert_srgb_to_linear_rgb_array(srgb_color_components):
+    """
+    Converting a NumPy array of sRGB color components to Linear RGB in one vectorized pass
+
+    Same formula as convert_srgb_to_linear_rgb() but without the branch,
+    both sides are calculated and np.where() selects the result for each component
+    """
+    return np.where(
+        srgb_color_components <= 0.04045,
+        srgb_color_components / 12.92,
+        ((srgb_color_components + 0.055) / 1.055) ** 2.4,
+    )
+
+
+# a hex color component is always one of 256 values,
+# so the sRGB to Linear RGB conversion is precomputed once for all of them
+_SRGB_TO_LINEAR_LUT = tuple(convert_srgb_to_linear_rgb_array(np.arange(256) / 255).tolist())
+
+
 def apply_material(material):
     obj = active_object()
     obj.data.materials.append(material)
@@ -240,8 +295,22 @@ def apply_emission_material(color, name=None, energy=1):
     obj.data.materials.append(material)
 
 
+# unnamed emission materials created by create_emission_material() keyed by their color and energy,
+# so objects with the same emission share one material
+_EMISSION_CACHE = {}
+
+
 def create_emission_material(color, name=None, energy=30, return_nodes=False):
+    cache_key = None
     if name is None:
+        cache_key = (tuple(round(component, 6) for component in color), energy)
+        material = _EMISSION_CACHE.get(cache_key)
+        if material is not None:
+            if return_nodes:
+                return material, material.node_tree.nodes
+            else:
+                return material
+
         name = ""
 
     material = bpy.data.materials.new(name=f"material.emission.{name}")
@@ -259,6 +328,9 @@ def create_emission_material(color, name=None, energy=30, return_nodes=False):
 
     material.node_tree.links.new(node_emission.outputs["Emission"], out_node.inputs["Surface"])
 
+    if cache_key is not None:
+        _EMISSION_CACHE[cache_key] = material
+
     if return_nodes:
         return material, material.node_tree.nodes
     else:
@@ -276,15 +348,50 @@ def parent(child_obj, parent_obj, keep_transform=False):
 
 
 def add_bezier_circle(radius=1.0, bevel_depth=0.0, resolution_u=12, extrude=0):
-    bpy.ops.curve.primitive_bezier_circle_add(radius=radius)
+    # build the curve data directly instead of using bpy.ops.curve.primitive_bezier_circle_add(),
+    # so all the curve settings are in place before the curve is evaluated for the first time
+    curve_data = bpy.data.curves.new(name="BezierCircle", type="CURVE")
+    curve_data.dimensions = "3D"
+    curve_data.bevel_depth = bevel_depth
+    curve_data.resolution_u = resolution_u
+    curve_data.extrude = extrude
+
+    # the same four control points with automatic handles as the bezier circle primitive
+    spline = curve_data.splines.new("BEZIER")
+    spline.bezier_points.add(3)
+    for bezier_point, (x, y) in zip(spline.bezier_points, ((-1, 0), (0, 1), (1, 0), (0, -1))):
+        bezier_point.co = (x * radius, y * radius, 0)
+        bezier_point.handle_left_type = "AUTO"
+        bezier_point.handle_right_type = "AUTO"
+    spline.use_cyclic_u = True
+
+    bezier_circle_obj = bpy.data.objects.new(name="BezierCircle", object_data=curve_data)
+    bpy.context.collection.objects.link(bezier_circle_obj)
+
+    # the callers expect the new circle to be the active object
+    make_active(bezier_circle_obj)
 
-    bezier_circle_obj = active_object()
+    return bezier_circle_obj
 
-    bezier_circle_obj.data.bevel_depth = bevel_depth
-    bezier_circle_obj.data.resolution_u = resolution_u
-    bezier_circle_obj.data.extrude = extrude
 
-    return bezier_circle_obj
+def animate_curve_path(curve_data, frame_start=1, length=100):
+    """
+    Animate the evaluation time of a curve path, same as
+    bpy.ops.constraint.followpath_path_animate() without the operator overhead
+    """
+    curve_data.use_path = True
+
+    animation_data = curve_data.animation_data_create()
+    if animation_data.action is None:
+        animation_data.action = bpy.data.actions.new(name=f"{curve_data.name}Action")
+
+    # a generator modifier makes the evaluation time grow by 100 every length frames, starting at frame_start
+    fcurve = animation_data.action.fcurves.new(data_path="eval_time")
+    slope = 100 / length
+    generator_modifier = fcurve.modifiers.new(type="GENERATOR")
+    generator_modifier.coefficients = (-frame_start * slope, slope)
+
+    return fcurve
 
 
 def add_round_cube(radius=1.0):
@@ -305,29 +412,58 @@ def add_subdivided_round_cube(radius=1.0):
 def create_data_animation_loop(obj, data_path, start_value, mid_value, start_frame, loop_length, linear_extrapolation=True):
     """
     To make a data property loop we need to:
-    1. set the property to an initial value and add a keyframe in the beginning of the loop
-    2. set the property to a middle value and add a keyframe in the middle of the loop
-    3. set the property the initial value and add a keyframe at the end of the loop
+    1. add a keyframe with an initial value in the beginning of the loop
+    2. add a keyframe with a middle value in the middle of the loop
+    3. add a keyframe with the initial value at the end of the loop
+
+    The keyframes are written directly into the F-Curves
+    instead of calling keyframe_insert() three times
     """
-    # set the start value
-    setattr(obj, data_path, start_value)
-    # add a keyframe at the start
-    obj.keyframe_insert(data_path, frame=start_frame)
+    animated_id = obj.id_data
+    fcurve_data_path = obj.path_from_id(data_path)
+
+    animation_data = animated_id.animation_data_create()
+    if animation_data.action is None:
+        animation_data.action = bpy.data.actions.new(name=f"{animated_id.name}Action")
+    action = animation_data.action
 
-    # set the middle value
-    setattr(obj, data_path, mid_value)
-    # add a keyframe in the middle
     mid_frame = start_frame + (loop_length) / 2
-    obj.keyframe_insert(data_path, frame=mid_frame)
+    end_frame = start_frame + loop_length
+
+    # a vector property (like location) has one F-Curve per component
+    if isinstance(start_value, (int, float)):
+        start_values, mid_values = [start_value], [mid_value]
+    else:
+        start_values, mid_values = list(start_value), list(mid_value)
+
+    fcurves = []
+    for index, (start_component, mid_component) in enumerate(zip(start_values, mid_values)):
+        fcurve = action.fcurves.find(fcurve_data_path, index=index)
+        if fcurve is None:
+            fcurve = action.fcurves.new(data_path=fcurve_data_path, index=index)
+
+        keyframe_points = fcurve.keyframe_points
+        first_index = len(keyframe_points)
+        keyframe_points.add(3)
+
+        # write the coordinates of all the keyframe points in one call
+        keyframe_coords = np.empty(len(keyframe_points) * 2, dtype=np.float32)
+        if first_index:
+            keyframe_points.foreach_get("co", keyframe_coords)
+        keyframe_coords[first_index * 2 :] = (start_frame, start_component, mid_frame, mid_component, end_frame, start_component)
+        keyframe_points.foreach_set("co", keyframe_coords)
+        fcurve.update()
+
+        if linear_extrapolation:
+            # set the extrapolation on the F-Curve directly instead of looping over all the F-Curves of the active object
+            fcurve.extrapolation = "LINEAR"
 
-    # set the end value
+        fcurves.append(fcurve)
+
+    # leave the property at the initial value, same as after the last keyframe
     setattr(obj, data_path, start_value)
-    # add a keyframe in the end
-    end_frame = start_frame + loop_length
-    obj.keyframe_insert(data_path, frame=end_frame)
 
-    if linear_extrapolation:
-        set_fcurve_extrapolation_to_linear()
+    return fcurves
 
 
 def enable_addon(addon_module_name):
@@ -363,11 +499,16 @@ def add_fcruve_cycles_modifier(obj=None):
         modifier.mode_after = "REPEAT"
 
 
-def animate_up_n_down_bob(start_value, mid_value, obj=None, loop_length=90, start_frame=random.randint(0, 60)):
+def animate_up_n_down_bob(start_value, mid_value, obj=None, loop_length=90, start_frame=None):
     """Animate the up and down bobbing motion of an object. Apply a fcurve cycles modifier to make it seamless."""
     if obj is None:
         obj = active_object()
 
+    # pick the start frame on every call, a random default argument is only evaluated once when the script is loaded
+    # (before the seed is set in scene_setup)
+    if start_frame is None:
+        start_frame = random.randint(0, 60)
+
     create_data_animation_loop(
         obj,
         "location",
@@ -381,10 +522,15 @@ def animate_up_n_down_bob(start_value, mid_value, obj=None, loop_length=90, star
     add_fcruve_cycles_modifier(obj)
 
 
+_TWO_PI = 2.0 * math.pi
+
+
 def get_random_rotation():
-    x = math.radians(random.uniform(0, 360))
-    y = math.radians(random.uniform(0, 360))
-    z = math.radians(random.uniform(0, 360))
+    # draw the angles directly in radians instead of converting from degrees
+    uniform = random.uniform
+    x = uniform(0, _TWO_PI)
+    y = uniform(0, _TWO_PI)
+    z = uniform(0, _TWO_PI)
     return mathutils.Euler((x, y, z))
 
 
@@ -399,7 +545,8 @@ def add_displace_modifier(name, texture_type, empty_obj=None):
     texture = bpy.data.textures.new(f"texture.{name}", texture_type)
 
     bpy.ops.object.modifier_add(type="DISPLACE")
-    displace_modifier = obj.modifiers["Displace"]
+    # the new modifier is the last one in the stack
+    displace_modifier = obj.modifiers[-1]
     displace_modifier.texture = texture
     displace_modifier.name = f"displace.{name}"
     displace_modifier.texture_coords = "OBJECT"
@@ -417,45 +564,61 @@ def add_displace_modifier(name, texture_type, empty_obj=None):
 # bpybb end
 
 
+@functools.lru_cache(maxsize=1)
 def load_color_palettes():
-    return [
-        ["#69D2E7", "#A7DBD8", "#E0E4CC", "#F38630", "#FA6900"],
-        ["#FE4365", "#FC9D9A", "#F9CDAD", "#C8C8A9", "#83AF9B"],
-        ["#ECD078", "#D95B43", "#C02942", "#542437", "#53777A"],
-        ["#556270", "#4ECDC4", "#C7F464", "#FF6B6B", "#C44D58"],
-        ["#774F38", "#E08E79", "#F1D4AF", "#ECE5CE", "#C5E0DC"],
-        ["#E8DDCB", "#CDB380", "#036564", "#033649", "#031634"],
-        ["#490A3D", "#BD1550", "#E97F02", "#F8CA00", "#8A9B0F"],
-        ["#594F4F", "#547980", "#45ADA8", "#9DE0AD", "#E5FCC2"],
-        ["#00A0B0", "#6A4A3C", "#CC333F", "#EB6841", "#EDC951"],
-        ["#E94E77", "#D68189", "#C6A49A", "#C6E5D9", "#F4EAD5"],
-        ["#3FB8AF", "#7FC7AF", "#DAD8A7", "#FF9E9D", "#FF3D7F"],
-        ["#D9CEB2", "#948C75", "#D5DED9", "#7A6A53", "#99B2B7"],
-        ["#FFFFFF", "#CBE86B", "#F2E9E1", "#1C140D", "#CBE86B"],
-        ["#343838", "#005F6B", "#008C9E", "#00B4CC", "#00DFFC"],
-        ["#EFFFCD", "#DCE9BE", "#555152", "#2E2633", "#99173C"],
-        ["#413E4A", "#73626E", "#B38184", "#F0B49E", "#F7E4BE"],
-    ]
+    # cached, so return immutable tuples
+    return (
+        ("#69D2E7", "#A7DBD8", "#E0E4CC", "#F38630", "#FA6900"),
+        ("#FE4365", "#FC9D9A", "#F9CDAD", "#C8C8A9", "#83AF9B"),
+        ("#ECD078", "#D95B43", "#C02942", "#542437", "#53777A"),
+        ("#556270", "#4ECDC4", "#C7F464", "#FF6B6B", "#C44D58"),
+        ("#774F38", "#E08E79", "#F1D4AF", "#ECE5CE", "#C5E0DC"),
+        ("#E8DDCB", "#CDB380", "#036564", "#033649", "#031634"),
+        ("#490A3D", "#BD1550", "#E97F02", "#F8CA00", "#8A9B0F"),
+        ("#594F4F", "#547980", "#45ADA8", "#9DE0AD", "#E5FCC2"),
+        ("#00A0B0", "#6A4A3C", "#CC333F", "#EB6841", "#EDC951"),
+        ("#E94E77", "#D68189", "#C6A49A", "#C6E5D9", "#F4EAD5"),
+        ("#3FB8AF", "#7FC7AF", "#DAD8A7", "#FF9E9D", "#FF3D7F"),
+        ("#D9CEB2", "#948C75", "#D5DED9", "#7A6A53", "#99B2B7"),
+        ("#FFFFFF", "#CBE86B", "#F2E9E1", "#1C140D", "#CBE86B"),
+        ("#343838", "#005F6B", "#008C9E", "#00B4CC", "#00DFFC"),
+        ("#EFFFCD", "#DCE9BE", "#555152", "#2E2633", "#99173C"),
+        ("#413E4A", "#73626E", "#B38184", "#F0B49E", "#F7E4BE"),
+    )
+
+
+def convert_hex_palettes_to_rgba_array(hex_color_palettes):
+    """
+    Converting a list of hex color palettes into a NumPy array of Linear RGBA colors
+    with the shape (palette count, colors per palette, 4)
+    """
+    return np.array([[hex_color_to_rgba(hex_color) for hex_color in palette] for palette in hex_color_palettes], dtype=np.float32)
+
+
+# all the palettes are converted to Linear RGBA once when the script is loaded
+_PALETTES_RGBA = convert_hex_palettes_to_rgba_array(load_color_palettes())
 
 
 def select_random_color_palette():
-    random_palette = random.choice(load_color_palettes())
+    palette_index = random.randrange(len(_PALETTES_RGBA))
     print("Random palette:")
-    pprint.pprint(random_palette)
-    return random_palette
+    pprint.pprint(load_color_palettes()[palette_index])
+    return _PALETTES_RGBA[palette_index]
 
 
 def get_random_color(color_palette):
-    hex_color = random.choice(color_palette)
-    return hex_color_to_rgba(hex_color)
+    return tuple(color_palette[random.randrange(len(color_palette))].tolist())
 
 
 def setup_camera(loc, rot):
     """
     create and setup the camera
     """
-    bpy.ops.object.camera_add(location=loc, rotation=rot)
-    camera = active_object()
+    # create the camera with the data API to avoid the operator overhead of bpy.ops.object.camera_add
+    camera = bpy.data.objects.new(name="Camera", object_data=bpy.data.cameras.new(name="Camera"))
+    camera.location = loc
+    camera.rotation_euler = rot
+    bpy.context.collection.objects.link(camera)
 
     # set the camera as the "active camera" in the scene
     bpy.context.scene.camera = camera
@@ -476,6 +639,66 @@ def setup_camera(loc, rot):
     return empty
 
 
+def get_gpu_devices(cycles_preferences, compute_device_type):
+    """
+    Returns the GPU devices of the backend listed in the Cycles preferences
+    """
+    return [device for device in cycles_preferences.get_devices_for_type(compute_device_type) if device.type == compute_device_type]
+
+
+def enable_gpu_devices():
+    """
+    Make sure the devices of a GPU backend are enabled in the Cycles preferences
+    and return the name of the backend (or None if there are no GPU devices)
+
+    The preferences are not touched when the user already picked a GPU backend with enabled devices,
+    otherwise the changes only last for this session and are not saved with the preferences
+
+    Setting scene.cycles.device = "GPU" alone silently renders on the CPU
+    when no GPU device is enabled in the preferences
+    """
+    preferences = bpy.context.preferences
+    cycles_preferences = preferences.addons["cycles"].preferences
+
+    compute_device_types = ("OPTIX", "CUDA", "HIP", "ONEAPI", "METAL")
+
+    original_compute_device_type = cycles_preferences.compute_device_type
+    if original_compute_device_type in compute_device_types:
+        if any(device.use for device in get_gpu_devices(cycles_preferences, original_compute_device_type)):
+            return original_compute_device_type
+
+    original_device_use = {device.id: device.use for device in cycles_preferences.devices}
+    # the changes below should not be written to userpref.blend when the preferences are auto-saved
+    original_is_dirty = preferences.is_dirty
+
+    enabled_compute_device_type = None
+    for compute_device_type in compute_device_types:
+        try:
+            cycles_preferences.compute_device_type = compute_device_type
+        except TypeError:
+            # the backend is not available in this version of Blender or on this platform
+            continue
+
+        gpu_devices = get_gpu_devices(cycles_preferences, compute_device_type)
+        if gpu_devices:
+            # keep the devices the user picked, enable all of them only when none are enabled
+            if not any(device.use for device in gpu_devices):
+                for device in gpu_devices:
+                    device.use = True
+            enabled_compute_device_type = compute_device_type
+            break
+    else:
+        # there are no GPU devices, leave the preferences as they were before
+        cycles_preferences.compute_device_type = original_compute_device_type
+        for device in cycles_preferences.devices:
+            if device.id in original_device_use:
+                device.use = original_device_use[device.id]
+
+    preferences.is_dirty = original_is_dirty
+
+    return enabled_compute_device_type
+
+
 def set_scene_props(fps, loop_seconds):
     """
     Set scene properties
@@ -499,17 +722,88 @@ def set_scene_props(fps, loop_seconds):
 
     # Use the GPU to render
     scene.cycles.device = "GPU"
+    if enable_gpu_devices() is None:
+        print("No GPU devices found, rendering on the CPU")
+        scene.cycles.device = "CPU"
 
     # Use the CPU to render
     # scene.cycles.device = "CPU"
 
-    scene.cycles.samples = 300
+    # the frame is split into tiles that are shared between the devices only before Blender 3.0 (Cycles X renders the whole frame at once),
+    # 128px tiles give 81 tiles for the 1080px render to keep several GPUs busy until the end of the frame
+    if hasattr(scene.render, "tile_x"):
+        scene.render.tile_x = 128
+        scene.render.tile_y = 128
+
+    # stop sampling a pixel once the noise is below the threshold,
+    # most pixels converge well before the maximum number of samples
+    scene.cycles.use_adaptive_sampling = True
+    scene.cycles.adaptive_threshold = 0.01
+    scene.cycles.adaptive_min_samples = 32
+    scene.cycles.samples = 512
+
+    # clean up the remaining noise with the denoiser
+    scene.cycles.use_denoising = True
+    scene.cycles.denoiser = "OPENIMAGEDENOISE"
+    scene.cycles.denoising_input_passes = "RGB_ALBEDO_NORMAL"
+
+    # the light tree is only available in Blender 3.5 and higher
+    if hasattr(scene.cycles, "use_light_tree"):
+        # sample the emissive ring in add_lights() more efficiently
+        scene.cycles.use_light_tree = True
+
+    # keep the render data between the frames of the animation,
+    # so only the data that changed is synced to Cycles instead of the whole scene for every frame
+    scene.render.use_persistent_data = True
 
     scene.view_settings.look = "Very High Contrast"
 
     set_1080px_square_render_res()
 
 
+def parse_script_args(frame_count):
+    """
+    Parse the arguments passed to the script after "--", for example:
+    blender -b -P script_done.py -- --seed 1234 --frame-slice 1:60
+
+    This allows splitting the animation into frame slices that are rendered by separate Blender processes,
+    all processes must use the same seed to generate the same scene.
+    Unknown arguments are ignored so other scripts can share the command line.
+    """
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(prog="script_done.py")
+    parser.add_argument("--seed", type=int, default=None, help="random seed used to generate the scene, required with --frame-slice")
+    parser.add_argument("--frame-slice", default=None, help=f"range of frames to render between 1 and {frame_count}, for example 1:60")
+    script_args, _ = parser.parse_known_args(argv)
+
+    if script_args.frame_slice:
+        if script_args.seed is None:
+            parser.error("--frame-slice requires --seed, otherwise every slice renders a different scene")
+
+        try:
+            frame_start, frame_end = (int(frame) for frame in script_args.frame_slice.split(":"))
+        except ValueError:
+            parser.error(f"--frame-slice must be in the form start:end, got {script_args.frame_slice}")
+
+        if not 1 <= frame_start <= frame_end <= frame_count:
+            parser.error(f"--frame-slice {script_args.frame_slice} must be within 1:{frame_count} with start <= end")
+
+        script_args.frame_slice = (frame_start, frame_end)
+
+    return script_args
+
+
+def set_frame_slice(frame_start, frame_end):
+    """
+    Limit the frame range of the scene to the frames between frame_start and frame_end
+    """
+    scene = bpy.context.scene
+    scene.frame_start = frame_start
+    scene.frame_end = frame_end
+    scene.frame_current = frame_start
+
+
 def scene_setup(i=0):
     fps = 30
     loop_seconds = 12
@@ -518,11 +812,14 @@ def scene_setup(i=0):
     project_name = "holder"
     bpy.context.scene.render.image_settings.file_format = "PNG"
 
-    seed = 0
-    if seed:
+    script_args = parse_script_args(frame_count)
+
+    seed = script_args.seed
+    if seed is not None:
         random.seed(seed)
     else:
-        seed = time_seed()
+        # there is no one to paste the seed when running in the background (batch rendering)
+        seed = time_seed(copy_to_clipboard=not bpy.app.background)
 
     bpy.context.scene.render.filepath = f"/tmp/project_{project_name}_{seed}/"
 
@@ -532,8 +829,13 @@ def scene_setup(i=0):
         clean_scene_experimental()
     else:
         clean_scene()
+    # the cached materials were removed with the rest of the scene data
+    _EMISSION_CACHE.clear()
 
     set_scene_props(fps, loop_seconds)
+    if script_args.frame_slice:
+        # the animation is still built for the full loop, only the rendered frame range changes
+        set_frame_slice(*script_args.frame_slice)
 
     loc = (0, 0, 3.5)
     rot = (0, 0, 0)
@@ -546,18 +848,37 @@ def scene_setup(i=0):
     return context
 
 
+def add_area_light(radius=1.0, location=(0, 0, 0)):
+    """
+    Add an area light with the data API,
+    same as bpy.ops.object.light_add(type="AREA", radius=radius, location=location) without the operator overhead
+    """
+    light_data = bpy.data.lights.new(name="Area", type="AREA")
+    # the light_add operator multiplies the radius of area lights by 4
+    # and then scales the default light sizes (0.25) by it, so a radius of 5 gives a 5m light
+    size_scale = radius * 4
+    light_data.size *= size_scale
+    light_data.size_y *= size_scale
+    light_data.shadow_soft_size *= size_scale
+
+    light = bpy.data.objects.new(name="Area", object_data=light_data)
+    light.location = location
+    bpy.context.collection.objects.link(light)
+
+    return light
+
+
 def add_lights(color_palette):
     """Add lights into the scene"""
-    bpy.ops.object.light_add(type="AREA", radius=5, location=(0, 0, -5))
-    light = active_object()
-    light.data.shape = "DISK"
-    light.data.energy = random.choice([200, 300, 500])
+    light = add_area_light(radius=5, location=(0, 0, -5))
+    light_data = light.data
+    light_data.shape = "DISK"
+    light_data.energy = random.choice([200, 300, 500])
     light.rotation_euler.y = math.radians(180)
 
-    bpy.ops.object.light_add(type="AREA", radius=5, location=(0, 0, 5))
-    light = active_object()
-    light.data.shape = "DISK"
-    light.data.energy = 100
+    light_data = add_area_light(radius=5, location=(0, 0, 5)).data
+    light_data.shape = "DISK"
+    light_data.energy = 100
 
     add_bezier_circle(radius=1.5, bevel_depth=0.0, resolution_u=12, extrude=0.1)
     apply_emission_material(get_random_color(color_palette), energy=100)
@@ -568,96 +889,123 @@ def add_lights(color_palette):
 ################################################################
 
 
+# socket indices keyed by (node type, socket identifier, is output),
+# the sockets of a node type are always in the same order so every index only needs to be found once
+_SOCKET_INDEX_CACHE = {}
+
+
+def get_socket_by_identifier(node, identifier, is_output=False):
+    """
+    Returns the input (or output) socket of the node with the given identifier
+
+    Sockets like the inputs of the Mix node share the same name (A, B)
+    so they need to be found by their unique identifier (A_Color, B_Color)
+    """
+    sockets = node.outputs if is_output else node.inputs
+
+    key = (node.bl_idname, identifier, is_output)
+    socket_index = _SOCKET_INDEX_CACHE.get(key)
+    if socket_index is None:
+        socket_index = next(index for index, socket in enumerate(sockets) if socket.identifier == identifier)
+        _SOCKET_INDEX_CACHE[key] = socket_index
+
+    return sockets[socket_index]
+
+
 def create_spherical_gradient_tex_mask(material, node_location_step_x, node_y_location):
     """Adds a group of nodes that creates the spherical mask to separate the glass and metallic parts of the material"""
+    new_node = material.node_tree.nodes.new
+    new_link = material.node_tree.links.new
+
     node_x_location = 0
-    texture_coordinate_node = material.node_tree.nodes.new(type="ShaderNodeTexCoord")
-    texture_coordinate_node.location = mathutils.Vector((node_x_location, node_y_location))
+    texture_coordinate_node = new_node(type="ShaderNodeTexCoord")
+    texture_coordinate_node.location = (node_x_location, node_y_location)
     node_x_location += node_location_step_x
 
-    mapping_node = material.node_tree.nodes.new(type="ShaderNodeMapping")
-    mapping_node.location = mathutils.Vector((node_x_location, node_y_location))
+    mapping_node = new_node(type="ShaderNodeMapping")
+    mapping_node.location = (node_x_location, node_y_location)
     node_x_location += node_location_step_x
 
-    gradient_texture_node = material.node_tree.nodes.new(type="ShaderNodeTexGradient")
+    gradient_texture_node = new_node(type="ShaderNodeTexGradient")
     gradient_texture_node.gradient_type = "SPHERICAL"
-    gradient_texture_node.location = mathutils.Vector((node_x_location, node_y_location))
+    gradient_texture_node.location = (node_x_location, node_y_location)
     node_x_location += node_location_step_x
 
-    mix_shader_color_ramp_node = material.node_tree.nodes.new(type="ShaderNodeValToRGB")
-    mix_shader_color_ramp_node.color_ramp.elements[1].position = 0.535
-    mix_shader_color_ramp_node.color_ramp.interpolation = "CONSTANT"
-    mix_shader_color_ramp_node.location = mathutils.Vector((node_x_location, node_y_location))
+    # a single comparison does the same as a color ramp with "CONSTANT" interpolation and a black to white step at 0.535
+    mix_shader_mask_node = new_node(type="ShaderNodeMath")
+    mix_shader_mask_node.operation = "GREATER_THAN"
+    mix_shader_mask_node.inputs[1].default_value = 0.535
+    mix_shader_mask_node.location = (node_x_location, node_y_location)
     node_x_location += node_location_step_x
 
-    material.node_tree.links.new(texture_coordinate_node.outputs["Object"], mapping_node.inputs["Vector"])
-    material.node_tree.links.new(mapping_node.outputs["Vector"], gradient_texture_node.inputs["Vector"])
-    material.node_tree.links.new(gradient_texture_node.outputs["Color"], mix_shader_color_ramp_node.inputs["Fac"])
+    new_link(texture_coordinate_node.outputs["Object"], mapping_node.inputs["Vector"])
+    new_link(mapping_node.outputs["Vector"], gradient_texture_node.inputs["Vector"])
+    new_link(gradient_texture_node.outputs["Fac"], mix_shader_mask_node.inputs[0])
 
-    return mix_shader_color_ramp_node, node_x_location
+    return mix_shader_mask_node, node_x_location
 
 
 def create_pointiness_edge_highlight_node_tree(color_palette, material, node_location_step_x, node_y_location):
     """Adds a group of nodes that highlights the edges of the Voronoi displacement
     part of the main material"""
+    new_node = material.node_tree.nodes.new
+    new_link = material.node_tree.links.new
+
     node_x_location = 0
-    geometry_node = material.node_tree.nodes.new(type="ShaderNodeNewGeometry")
-    geometry_node.location = mathutils.Vector((node_x_location, node_y_location))
+    geometry_node = new_node(type="ShaderNodeNewGeometry")
+    geometry_node.location = (node_x_location, node_y_location)
     node_x_location += node_location_step_x
 
-    color_ramp_node = material.node_tree.nodes.new(type="ShaderNodeValToRGB")
-    color_ramp_node.color_ramp.elements[0].color = (1, 1, 1, 1)
-    color_ramp_node.color_ramp.elements[1].color = (0, 0, 0, 1)
-    color_ramp_node.color_ramp.elements[1].position = 0.5
-    color_ramp_node.color_ramp.interpolation = "CONSTANT"
-    color_ramp_node.location = mathutils.Vector((node_x_location, node_y_location))
+    # a single comparison does the same as a color ramp with "CONSTANT" interpolation and a white to black step at 0.5
+    pointiness_step_node = new_node(type="ShaderNodeMath")
+    pointiness_step_node.operation = "LESS_THAN"
+    pointiness_step_node.inputs[1].default_value = 0.5
+    pointiness_step_node.location = (node_x_location, node_y_location)
     node_x_location += node_location_step_x
 
-    material.node_tree.links.new(geometry_node.outputs["Pointiness"], color_ramp_node.inputs["Fac"])
+    new_link(geometry_node.outputs["Pointiness"], pointiness_step_node.inputs[0])
 
-    mix_rgb_node = material.node_tree.nodes.new(type="ShaderNodeMix")
-    mix_rgb_node_input_lookup = {socket.identifier: socket for socket in mix_rgb_node.inputs.values()}
-    mix_rgb_node_output_lookup = {socket.identifier: socket for socket in mix_rgb_node.outputs.values()}
+    mix_rgb_node = new_node(type="ShaderNodeMix")
     mix_rgb_node.data_type = "RGBA"
     mix_rgb_node.blend_type = "MIX"
-    mix_rgb_node.location = mathutils.Vector((node_x_location, node_y_location))
+    mix_rgb_node.location = (node_x_location, node_y_location)
 
-    try_count = 5
-    color_a = get_random_color(color_palette)
-    color_b = get_random_color(color_palette)
-    while color_b == color_a and try_count > 0:
-        color_b = get_random_color(color_palette)
-        try_count -= 1
+    # pick two different palette colors in one step instead of retrying until they differ,
+    # some palettes repeat a color so the duplicates are removed first
+    unique_colors = list(dict.fromkeys(tuple(color) for color in color_palette.tolist()))
+    color_a, color_b = random.sample(unique_colors, 2)
 
-    mix_rgb_node_input_lookup["A_Color"].default_value = color_a
-    mix_rgb_node_input_lookup["B_Color"].default_value = color_b
+    get_socket_by_identifier(mix_rgb_node, "A_Color").default_value = color_a
+    get_socket_by_identifier(mix_rgb_node, "B_Color").default_value = color_b
     node_x_location += node_location_step_x
 
-    material.node_tree.links.new(color_ramp_node.outputs["Color"], mix_rgb_node_input_lookup["Factor_Float"])
+    new_link(pointiness_step_node.outputs["Value"], get_socket_by_identifier(mix_rgb_node, "Factor_Float"))
 
-    return mix_rgb_node_output_lookup["Result_Color"], node_x_location
+    return get_socket_by_identifier(mix_rgb_node, "Result_Color", is_output=True), node_x_location
 
 
 def create_glass_node_tree(color_palette, material, node_location_step_x, node_x_location, node_y_location):
     """Adds a group of nodes that creates the glass part of the main material"""
+    new_node = material.node_tree.nodes.new
+    new_link = material.node_tree.links.new
 
-    layer_weight_node = material.node_tree.nodes.new(type="ShaderNodeLayerWeight")
-    layer_weight_node.location = mathutils.Vector((node_x_location, node_y_location))
+    layer_weight_node = new_node(type="ShaderNodeLayerWeight")
+    layer_weight_node.location = (node_x_location, node_y_location)
     node_x_location += node_location_step_x
 
     base_color = get_random_color(color_palette)
 
-    color_ramp_node = material.node_tree.nodes.new(type="ShaderNodeValToRGB")
+    color_ramp_node = new_node(type="ShaderNodeValToRGB")
     color_ramp_node.color_ramp.elements[0].color = (0.0, 0.0, 0.0, 1.0)
     color_ramp_node.color_ramp.elements[0].position = 0.78
     color_ramp_node.color_ramp.elements[1].color = base_color
     color_ramp_node.color_ramp.elements[1].position = 1.00
-    color_ramp_node.location = mathutils.Vector((node_x_location, node_y_location))
+    color_ramp_node.location = (node_x_location, node_y_location)
     node_x_location += node_location_step_x
 
-    material.node_tree.links.new(layer_weight_node.outputs["Facing"], color_ramp_node.inputs["Fac"])
+    new_link(layer_weight_node.outputs["Facing"], color_ramp_node.inputs["Fac"])
 
-    principled_bsdf_node = material.node_tree.nodes.new(type="ShaderNodeBsdfPrincipled")
+    principled_bsdf_node = new_node(type="ShaderNodeBsdfPrincipled")
     principled_bsdf_node.inputs["Base Color"].default_value = base_color
     principled_bsdf_node.inputs["Metallic"].default_value = 0.0
     principled_bsdf_node.inputs["Specular"].default_value = 0.0
@@ -665,33 +1013,35 @@ def create_glass_node_tree(color_palette, material, node_location_step_x, node_x
     principled_bsdf_node.inputs["Transmission"].default_value = 1.0
     principled_bsdf_node.inputs["Emission Strength"].default_value = 15.0
     principled_bsdf_node.hide = True
-    principled_bsdf_node.location = mathutils.Vector((node_x_location, node_y_location))
+    principled_bsdf_node.location = (node_x_location, node_y_location)
 
-    material.node_tree.links.new(color_ramp_node.outputs["Color"], principled_bsdf_node.inputs["Emission"])
+    new_link(color_ramp_node.outputs["Color"], principled_bsdf_node.inputs["Emission"])
 
     return principled_bsdf_node
 
 
 def create_metallic_node_tree(color_palette, material, node_location_step_x):
     """Adds a group of nodes that creates the metallic part of the main material"""
+    new_node = material.node_tree.nodes.new
+    new_link = material.node_tree.links.new
 
     result = create_spherical_gradient_tex_mask(material, node_location_step_x, node_y_location=300)
-    mix_shader_color_ramp_node, spherical_gradient_x_location = result
+    mix_shader_mask_node, spherical_gradient_x_location = result
 
     result = create_pointiness_edge_highlight_node_tree(color_palette, material, node_location_step_x, node_y_location=-100)
     mix_rgb_node_output_color, edge_highlight_x_location = result
 
     node_x_location = max(spherical_gradient_x_location, edge_highlight_x_location)
 
-    principled_bsdf_node = material.node_tree.nodes.new(type="ShaderNodeBsdfPrincipled")
+    principled_bsdf_node = new_node(type="ShaderNodeBsdfPrincipled")
     principled_bsdf_node.inputs["Metallic"].default_value = 0.54
     principled_bsdf_node.inputs["Roughness"].default_value = 0.26
     principled_bsdf_node.hide = True
-    principled_bsdf_node.location = mathutils.Vector((node_x_location, 0))
+    principled_bsdf_node.location = (node_x_location, 0)
 
-    material.node_tree.links.new(mix_rgb_node_output_color, principled_bsdf_node.inputs["Base Color"])
+    new_link(mix_rgb_node_output_color, principled_bsdf_node.inputs["Base Color"])
 
-    return principled_bsdf_node, mix_shader_color_ramp_node, node_x_location
+    return principled_bsdf_node, mix_shader_mask_node, node_x_location
 
 
 def create_material(color_palette):
@@ -702,27 +1052,29 @@ def create_material(color_palette):
     # remove all nodes
     material.node_tree.nodes.clear()
 
+    new_node = material.node_tree.nodes.new
+    new_link = material.node_tree.links.new
+
     node_location_step_x = 300
     node_x_location = 0
 
-    principled_bsdf_node, mix_shader_color_ramp_node, node_x_location = create_metallic_node_tree(color_palette, material, node_location_step_x)
+    principled_bsdf_node, mix_shader_mask_node, node_x_location = create_metallic_node_tree(color_palette, material, node_location_step_x)
 
     principled_bsdf_glass_node = create_glass_node_tree(color_palette, material, node_location_step_x, node_x_location=600, node_y_location=-600)
 
     node_x_location += node_location_step_x
 
-    mix_shader_node = material.node_tree.nodes.new(type="ShaderNodeMixShader")
-    mix_shader_node_input_lookup = {socket.identifier: socket for socket in mix_shader_node.inputs.values()}
-    mix_shader_node.location = mathutils.Vector((node_x_location, 100))
+    mix_shader_node = new_node(type="ShaderNodeMixShader")
+    mix_shader_node.location = (node_x_location, 100)
     node_x_location += node_location_step_x
 
-    material_output = material.node_tree.nodes.new(type="ShaderNodeOutputMaterial")
-    material_output.location = mathutils.Vector((node_x_location, 0))
+    material_output = new_node(type="ShaderNodeOutputMaterial")
+    material_output.location = (node_x_location, 0)
 
-    material.node_tree.links.new(mix_shader_color_ramp_node.outputs["Color"], mix_shader_node_input_lookup["Fac"])
-    material.node_tree.links.new(principled_bsdf_node.outputs["BSDF"], mix_shader_node_input_lookup["Shader"])
-    material.node_tree.links.new(principled_bsdf_glass_node.outputs["BSDF"], mix_shader_node_input_lookup["Shader_001"])
-    material.node_tree.links.new(mix_shader_node.outputs["Shader"], material_output.inputs["Surface"])
+    new_link(mix_shader_mask_node.outputs["Value"], get_socket_by_identifier(mix_shader_node, "Fac"))
+    new_link(principled_bsdf_node.outputs["BSDF"], get_socket_by_identifier(mix_shader_node, "Shader"))
+    new_link(principled_bsdf_glass_node.outputs["BSDF"], get_socket_by_identifier(mix_shader_node, "Shader_001"))
+    new_link(mix_shader_node.outputs["Shader"], material_output.inputs["Surface"])
 
     return material
 
@@ -734,7 +1086,11 @@ def create_mesh(ctrl_empty, radius=1.0):
 
     subdivision_modifier.levels = 5
     subdivision_modifier.render_levels = 7
-    bpy.ops.object.shade_smooth()
+
+    # shade smooth by setting all the polygons in one call instead of using bpy.ops.object.shade_smooth()
+    polygons = round_cube.data.polygons
+    polygons.foreach_set("use_smooth", np.ones(len(polygons), dtype=bool))
+    round_cube.data.update()
 
 
 def animate_displace_modifier(context):
@@ -748,13 +1104,11 @@ def animate_displace_modifier(context):
     loop_circle_path.name = "loop_circle_path"
     loop_circle_path.data.path_duration = context["frame_count"]
 
-    make_active(empty)
-
     empty.rotation_euler = get_random_rotation()
 
-    bpy.ops.object.constraint_add(type="FOLLOW_PATH")
-    empty.constraints["Follow Path"].target = loop_circle_path
-    bpy.ops.constraint.followpath_path_animate(constraint="Follow Path", owner="OBJECT")
+    follow_path_constraint = empty.constraints.new(type="FOLLOW_PATH")
+    follow_path_constraint.target = loop_circle_path
+    animate_curve_path(loop_circle_path.data)
 
 
 def create_centerpiece(context):
@@ -782,6 +1136,9 @@ def main():
     create_centerpiece(context)
     add_lights(context["color_palette"])
 
+    # evaluate the scene once after everything is built
+    bpy.context.view_layer.update()
+
 
 if __name__ == "__main__":
     main()